@@ -0,0 +1,210 @@
+import argparse
+import statistics
+import sys
+import time
+
+import cv2
+
+from frame_gate import FrameChangeDetector, TextPresenceDetector
+from frame_sources import SyntheticFrameSource, create_frame_source
+from ocr_engine import create_ocr_engine
+from preprocessing import DENOISE_MODES, compile_preprocess, create_frame_averager, measure_denoise_cost
+from subtitle_tracking import TextStabilizer
+
+# 无界面基准测试：在 Linux 上用文件/图片序列/合成帧源跑同一条 抓取→预处理→OCR 流水线
+# 示例: python benchmark.py --source synthetic --frames 200 --preprocess grayscale,threshold
+
+
+def format_stats(name, samples):
+    if not samples:
+        return f"{name}: 无数据"
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return (f"{name}: 平均 {statistics.mean(samples):.2f} ms, 中位数 {statistics.median(samples):.2f} ms, "
+            f"p95 {p95:.2f} ms, 共 {len(samples)} 次")
+
+
+def run_benchmark(source, preprocess_options, ocr_engine, frames, change_detector=None, text_detector=None,
+                  stabilizer=None):
+    timings = {'grab': [], 'average': [], 'gate': [], 'detect': [], 'preprocess': [], 'ocr': [], 'no_text': 0}
+    # 文字检测的混淆计数，需要帧源提供真实文本（current_text，例如合成帧源）
+    detection = {'true_positive': 0, 'false_negative': 0, 'true_negative': 0, 'false_positive': 0}
+    preprocessor = compile_preprocess(preprocess_options)
+    frame_averager = create_frame_averager(preprocess_options)
+    with source:
+        for _ in range(frames):
+            start = time.perf_counter()
+            frame = source.grab()
+            timings['grab'].append((time.perf_counter() - start) * 1000)
+            if frame is None:
+                break
+
+            if frame_averager is not None:
+                # 多帧时间平均作用于每一帧原始画面，在变化检测之前
+                start = time.perf_counter()
+                frame = frame_averager.apply(frame)
+                timings['average'].append((time.perf_counter() - start) * 1000)
+
+            if change_detector is not None:
+                start = time.perf_counter()
+                changed = change_detector.has_changed(frame)
+                timings['gate'].append((time.perf_counter() - start) * 1000)
+                if not changed:
+                    continue
+
+            if text_detector is not None:
+                start = time.perf_counter()
+                has_text = text_detector.has_text(frame)
+                timings['detect'].append((time.perf_counter() - start) * 1000)
+                truth = getattr(source, 'current_text', None)
+                if truth is not None:
+                    if truth:
+                        detection['true_positive' if has_text else 'false_negative'] += 1
+                    else:
+                        detection['false_positive' if has_text else 'true_negative'] += 1
+                if not has_text:
+                    continue
+
+            start = time.perf_counter()
+            frame = preprocessor.process(frame)
+            timings['preprocess'].append((time.perf_counter() - start) * 1000)
+            if frame is None:
+                # 预处理判定没有文字，跳过 OCR
+                timings['no_text'] += 1
+                continue
+
+            if ocr_engine is not None:
+                start = time.perf_counter()
+                text = ocr_engine.recognize(frame)
+                timings['ocr'].append((time.perf_counter() - start) * 1000)
+                if stabilizer is not None:
+                    stabilizer.feed(text)
+    timings['detection'] = detection
+    return timings
+
+
+# 变化检测的回归检查：短句互相替换、在行尾追加词和标点，每一步都必须被判为变化
+GATE_CHECK_SEQUENCE = ['', 'Yes.', 'No.', '', 'OK', 'Hm?', 'Hello there my', 'Hello there my friend',
+                       'Hello there my friend.', '...how are you', '...how are you?']
+
+
+def check_change_gate(threshold, width=1000, height=80):
+    # 返回被变化检测漏掉的字幕列表，为空表示通过
+    source = SyntheticFrameSource(width=width, height=height)
+    detector = FrameChangeDetector(threshold=threshold)
+    missed = []
+    for text in GATE_CHECK_SEQUENCE:
+        if not detector.has_changed(source._render(text)) and detector.frames > 1:
+            missed.append(text)
+    return missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字幕捕获流水线基准测试")
+    parser.add_argument('--source', default='synthetic',
+                        help='帧源: screen / file:<视频> / images:<目录或通配符> / synthetic')
+    parser.add_argument('--region', default=None, help='捕获区域 x,y,w,h')
+    parser.add_argument('--frames', type=int, default=100, help='最多处理的帧数')
+    parser.add_argument('--preprocess', default='grayscale,threshold',
+                        help='逗号分隔的预处理选项: crop_text,color_key,grayscale,denoise,normalize_height,threshold,deskew')
+    parser.add_argument('--denoise-mode', default='median', choices=list(DENOISE_MODES),
+                        help='去噪方式（需在 --preprocess 中启用 denoise）')
+    parser.add_argument('--compare-denoise', action='store_true', help='测量每种去噪方式的单帧耗时')
+    parser.add_argument('--lang', default='eng', help='OCR 语言')
+    parser.add_argument('--no-ocr', action='store_true', help='只测抓取和预处理')
+    parser.add_argument('--pytesseract', action='store_true', help='强制使用 pytesseract 子进程引擎')
+    parser.add_argument('--line-cache', type=int, default=256, help='按行识别的缓存条数，0 表示整块识别')
+    parser.add_argument('--change-threshold', type=float, default=None,
+                        help='启用画面变化检测并设置阈值，未变化的帧跳过 OCR')
+    parser.add_argument('--stable-frames', type=int, default=None,
+                        help='启用多帧稳定：同一文本连续出现的帧数（需要 OCR）')
+    parser.add_argument('--stable-ms', type=int, default=250, help='多帧稳定：文本持续不变多少毫秒后放行')
+    parser.add_argument('--blank-frames', type=int, default=0,
+                        help='合成帧源每行字幕之后的空白帧数，用于评估文字检测的漏检率')
+    parser.add_argument('--noise', type=int, default=0, help='合成帧源叠加的噪声幅度')
+    parser.add_argument('--text-detect', action='store_true', help='启用文字快速检测，无文字的帧跳过 OCR')
+    parser.add_argument('--check-gate', action='store_true',
+                        help='只运行变化检测的回归检查（短句替换、追加词和标点），有漏检时返回非零')
+    args = parser.parse_args()
+
+    if args.check_gate:
+        threshold = 2.0 if args.change_threshold is None else args.change_threshold
+        missed = check_change_gate(threshold)
+        if missed:
+            print(f"变化检测漏掉 {len(missed)}/{len(GATE_CHECK_SEQUENCE) - 1} 步: {missed}")
+            sys.exit(1)
+        print(f"变化检测检查通过: {len(GATE_CHECK_SEQUENCE) - 1} 步全部检测到")
+        return
+
+    region = tuple(int(v) for v in args.region.split(',')) if args.region else None
+    enabled = set(filter(None, args.preprocess.split(',')))
+    preprocess_options = {key: key in enabled
+                          for key in ('crop_text', 'color_key', 'grayscale', 'denoise', 'normalize_height',
+                                      'threshold', 'deskew')}
+    preprocess_options['denoise_mode'] = args.denoise_mode
+
+    source_options = {}
+    if args.source == 'synthetic':
+        source_options = {'blank_frames': args.blank_frames, 'noise': args.noise}
+    source = create_frame_source(args.source, region=region, **source_options)
+    change_detector = None
+    if args.change_threshold is not None:
+        change_detector = FrameChangeDetector(threshold=args.change_threshold)
+    text_detector = TextPresenceDetector() if args.text_detect else None
+    stabilizer = None
+    if args.stable_frames is not None:
+        stabilizer = TextStabilizer(frames=args.stable_frames, duration=args.stable_ms / 1000)
+    ocr_engine = None
+    if not args.no_ocr:
+        ocr_engine = create_ocr_engine(args.lang, prefer_api=not args.pytesseract,
+                                       line_cache_size=args.line_cache)
+    try:
+        timings = run_benchmark(source, preprocess_options, ocr_engine, args.frames,
+                                change_detector=change_detector, text_detector=text_detector,
+                                stabilizer=stabilizer)
+    finally:
+        if ocr_engine is not None:
+            ocr_engine.close()
+
+    print(format_stats("抓取", timings['grab']))
+    if timings['average']:
+        print(format_stats("多帧时间平均（原始帧）", timings['average']))
+    if change_detector is not None:
+        print(format_stats("变化检测", timings['gate']))
+        print(f"跳过未变化帧: {change_detector.skipped}/{change_detector.frames} "
+              f"({change_detector.skip_ratio:.1%})")
+    if text_detector is not None:
+        print(format_stats("文字检测", timings['detect']))
+        print(f"无文字跳过: {text_detector.empty}/{text_detector.frames} ({text_detector.empty_ratio:.1%})")
+        detection = timings['detection']
+        with_text = detection['true_positive'] + detection['false_negative']
+        without_text = detection['true_negative'] + detection['false_positive']
+        if with_text or without_text:
+            # 漏检（有字幕却判为无文字）会直接丢字幕，是最需要关注的指标
+            print(f"漏检率: {detection['false_negative']}/{with_text} "
+                  f"({detection['false_negative'] / with_text if with_text else 0:.1%}), "
+                  f"误检率: {detection['false_positive']}/{without_text} "
+                  f"({detection['false_positive'] / without_text if without_text else 0:.1%})")
+    print(format_stats("预处理", timings['preprocess']))
+    if preprocess_options['crop_text']:
+        print(f"无文字跳过 OCR: {timings['no_text']}/{len(timings['preprocess'])}")
+    if args.compare_denoise:
+        with create_frame_source(args.source, region=region) as sample_source:
+            sample = sample_source.grab()
+        if sample is not None:
+            if preprocess_options['grayscale']:
+                sample = cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY)
+            for mode, name in DENOISE_MODES.items():
+                print(f"去噪 {name}: {measure_denoise_cost(mode, sample):.2f} ms/帧")
+    if not args.no_ocr:
+        print(format_stats("OCR", timings['ocr']))
+        if stabilizer is not None:
+            print(f"多帧稳定: 放行 {stabilizer.emitted} 段文本, 未稳定丢弃 {stabilizer.avoided} 段（省下的翻译）, "
+                  f"平均增加延迟 {stabilizer.mean_latency * 1000:.1f} ms")
+        if hasattr(ocr_engine, 'hit_ratio'):
+            print(f"行缓存命中: {ocr_engine.hits}/{ocr_engine.hits + ocr_engine.misses} "
+                  f"({ocr_engine.hit_ratio:.1%})")
+
+
+if __name__ == "__main__":
+    main()
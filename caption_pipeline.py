@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from preprocessing import compile_preprocess, create_frame_averager
+from subtitle_tracking import GrowingLineTracker, SentenceDedupIndex
+from transcript_store import TranscriptStore
+from windows_live_captions import recognize_frame, find_new_sentences, translate_text
+
+# 流水线结束标记
+_STOP = object()
+# 画面有变化但没有文字：不做 OCR，直接按空文本处理，多帧稳定和增量字幕跟踪能看到字幕消失
+_EMPTY = object()
+
+
+class CaptionPipeline:
+    # 捕获 → OCR → 翻译 三个独立阶段，用有界队列连接：
+    #   捕获阶段在专用线程中抓图并做变化检测，帧队列满时丢弃最旧的帧（只关心最新画面）；
+    #   OCR 阶段在专用线程中预处理和识别，文本队列满时阻塞等待（反压），不丢字幕；
+    #   翻译阶段最多并发 max_translations 个请求，并按识别顺序回调 on_result。
+    # 字幕分两步发出：识别出新原文后立即写入会话记录并回调 on_original(编号, 原文)，
+    # 译文返回后按同一编号补齐记录并回调 on_translation(编号, 译文)，原文的显示不必等待网络往返。
+    # 吞吐量由最慢的阶段决定，而不是各阶段耗时之和。
+    # 帧源结束时已识别的字幕全部翻译完再退出；调用 stop() 时立即取消各阶段和进行中的翻译，
+    # 未翻译的字幕记为翻译失败，不等待积压的网络请求。
+    def __init__(self, frame_source, preprocess_options, ocr_lang, translate_src, translate_dest, on_result,
+                 change_detector=None, ocr_engine=None, scheduler=None, text_detector=None,
+                 frame_queue_size=1, text_queue_size=8, max_translations=3, dedup_threshold=0.85,
+                 growing_lines=False, line_timeout=1.5, on_partial=None, stabilizer=None, transcript=None,
+                 on_original=None, on_translation=None):
+        self.frame_source = frame_source
+        self.preprocess_options = preprocess_options
+        self.ocr_lang = ocr_lang
+        self.translate_src = translate_src
+        self.translate_dest = translate_dest
+        self.on_result = on_result
+        self.change_detector = change_detector
+        self.ocr_engine = ocr_engine
+        self.scheduler = scheduler
+        self.text_detector = text_detector
+        # 预处理选项在启动时编译一次；每条流水线对应一个捕获区域，缓冲区和倾斜角度等跨帧状态随之保存
+        self.preprocessor = compile_preprocess(preprocess_options)
+        # 多帧时间平均作用于每一帧原始画面，在变化检测之前进行
+        self.frame_averager = create_frame_averager(preprocess_options)
+        self.frame_queue_size = frame_queue_size
+        self.text_queue_size = text_queue_size
+        self.max_translations = max_translations
+        self.running = True
+        # 最近出现过的句子，OCR 抖动造成的近似重复不再重新翻译
+        self.last_sentences = SentenceDedupIndex(threshold=dedup_threshold)
+        # 增量字幕模式：逐词增长的行在句子结束前不翻译，正在输入的部分通过 on_partial 直接显示
+        self.line_tracker = None
+        if growing_lines:
+            self.line_tracker = GrowingLineTracker(self.last_sentences, timeout=line_timeout,
+                                                   threshold=dedup_threshold)
+        self.on_partial = on_partial
+        self.on_original = on_original
+        self.on_translation = on_translation
+        # 多帧稳定：OCR 结果稳定后才进入去重和翻译
+        self.stabilizer = stabilizer
+        self.pending_text = ""
+        # 会话字幕记录（有界内存环形缓冲区，可溢出到磁盘），替代不断拼接的 last_translation 字符串
+        self.transcript = transcript if transcript is not None else TranscriptStore()
+        self.dropped_frames = 0
+        self._ocr_busy = 0.0
+        self._text_changed = False
+        # 已写入记录、译文尚未返回的字幕编号
+        self._untranslated = set()
+        self._loop = None
+        self._stop_event = None
+
+    def stop(self):
+        # 可从任意线程调用
+        self.running = False
+        loop, event = self._loop, self._stop_event
+        if loop is not None and event is not None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 事件循环已经结束
+                pass
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # mss 等屏幕句柄与线程绑定，帧源的打开、抓取和关闭都在同一个捕获线程中进行
+        capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        ocr_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+        frame_queue = asyncio.Queue(maxsize=self.frame_queue_size)
+        text_queue = asyncio.Queue(maxsize=self.text_queue_size)
+        # 翻译任务按创建顺序排队等待输出，数量由信号量限制
+        pending_queue = asyncio.Queue()
+        translation_slots = asyncio.Semaphore(self.max_translations)
+        self._stop_event = asyncio.Event()
+        self._loop = loop
+        if not self.running:
+            self._stop_event.set()
+        stop_watcher = None
+        try:
+            await loop.run_in_executor(capture_executor, self.frame_source.open)
+            stages = [
+                asyncio.create_task(self._capture_stage(loop, capture_executor, frame_queue)),
+                asyncio.create_task(self._ocr_stage(loop, ocr_executor, frame_queue, text_queue,
+                                                    capture_executor)),
+                asyncio.create_task(self._translate_stage(text_queue, pending_queue, translation_slots)),
+                asyncio.create_task(self._emit_stage(pending_queue)),
+            ]
+            stop_watcher = asyncio.create_task(self._cancel_on_stop(stages, pending_queue))
+            done, pending = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                if not task.cancelled():
+                    task.result()
+        finally:
+            self.running = False
+            if stop_watcher is not None:
+                stop_watcher.cancel()
+            self._loop = None
+            self._discard_untranslated()
+            await loop.run_in_executor(capture_executor, self.frame_source.close)
+            capture_executor.shutdown(wait=True)
+            ocr_executor.shutdown(wait=True)
+
+    async def _cancel_on_stop(self, stages, pending_queue):
+        # 停止请求到达后不再排空队列：取消各阶段和所有已发出的翻译请求
+        await self._stop_event.wait()
+        for task in stages:
+            task.cancel()
+        while not pending_queue.empty():
+            item = pending_queue.get_nowait()
+            if item is not _STOP:
+                item[2].cancel()
+
+    def _discard_untranslated(self):
+        # 停止时被丢弃的字幕记为翻译失败，界面上不会一直显示为翻译中
+        for entry_id in sorted(self._untranslated):
+            self.transcript.update(entry_id, "")
+            if self.on_translation is not None:
+                self.on_translation(entry_id, "")
+        self._untranslated.clear()
+
+    def _put_latest(self, queue, item):
+        # 丢弃最旧策略：队列满时先移除最旧的帧再放入最新的帧
+        while queue.full():
+            queue.get_nowait()
+            self.dropped_frames += 1
+        queue.put_nowait(item)
+
+    def _grab(self):
+        frame = self.frame_source.grab()
+        if frame is None:
+            return None, False
+        if self.frame_averager is not None:
+            frame = self.frame_averager.apply(frame)
+        # 字幕区域与上一次识别时相比没有变化，跳过预处理和 OCR
+        if self.change_detector is not None and not self.change_detector.has_changed(frame):
+            return None, True
+        # 字幕区域里没有文字，不送去 OCR，但要告知 OCR 阶段文字已经消失
+        if self.text_detector is not None and not self.text_detector.has_text(frame):
+            return _EMPTY, True
+        # 帧源会复用缓冲区，进入队列的帧需要拷贝一份
+        return frame.copy(), True
+
+    def _grab_fresh(self):
+        # 不经过变化检测和文字检测强制抓取一帧，同时更新变化检测的参考帧
+        frame = self.frame_source.grab()
+        if frame is None:
+            return None
+        if self.frame_averager is not None:
+            frame = self.frame_averager.apply(frame)
+        if self.change_detector is not None:
+            self.change_detector.has_changed(frame)
+        return frame.copy()
+
+    async def _capture_stage(self, loop, executor, frame_queue):
+        while self.running:
+            tick_start = time.perf_counter()
+            frame, more = await loop.run_in_executor(executor, self._grab)
+            if not more:
+                logging.info("帧源已无更多帧，停止捕获")
+                break
+            if frame is not None:
+                self._put_latest(frame_queue, frame)
+            if self.scheduler is None:
+                await asyncio.sleep(0)
+                continue
+            # 根据捕获耗时、OCR 耗时和字幕是否变化决定下一次捕获时间
+            busy = time.perf_counter() - tick_start + self._ocr_busy
+            self._ocr_busy = 0.0
+            changed = frame is not None or self._text_changed
+            self._text_changed = False
+            await self._sleep_while_running(self.scheduler.next_delay(busy, changed))
+        # 结束标记沿着队列依次传递给下游阶段；出错时由 run() 直接取消各阶段
+        self._put_latest(frame_queue, _STOP)
+
+    async def _sleep_while_running(self, delay):
+        # 分段休眠，空闲退避到较长间隔时也能及时响应停止请求
+        deadline = time.perf_counter() + delay
+        while self.running:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, 0.1))
+
+    async def _ocr_stage(self, loop, executor, frame_queue, text_queue, capture_executor):
+        while True:
+            # 有等待稳定的文本或正在输入的部分文本时最多等到其到期，画面不再变化也能按时处理
+            try:
+                frame = await asyncio.wait_for(frame_queue.get(), self._next_deadline())
+            except asyncio.TimeoutError:
+                frame = None
+                if self._line_expired():
+                    # 部分文本即将按超时提交：变化检测可能漏掉了行尾新增的词，先强制重新抓取识别一次
+                    frame = await loop.run_in_executor(capture_executor, self._grab_fresh)
+                if frame is None:
+                    await self._handle_text(None, text_queue)
+                    continue
+            if frame is _STOP:
+                break
+            if frame is _EMPTY:
+                # 淡出时识别出的乱码随后被空白替换，稳定器将其计为未稳定而不会按时间放行
+                await self._handle_text("", text_queue)
+                continue
+            start = time.perf_counter()
+            text = await loop.run_in_executor(executor, recognize_frame, frame, self.preprocess_options,
+                                              self.ocr_lang, self.ocr_engine, self.preprocessor)
+            self._ocr_busy += time.perf_counter() - start
+            await self._handle_text(text, text_queue)
+        await text_queue.put(_STOP)
+
+    def _stabilizing(self):
+        return self.stabilizer is not None and self.stabilizer.time_until_stable() is not None
+
+    def _line_expired(self):
+        return (self.line_tracker is not None and not self._stabilizing()
+                and self.line_tracker.time_until_expiry() == 0)
+
+    def _next_deadline(self):
+        # 有尚未放行的新文本时先等它稳定，它可能正是这一行的后续，之后再判断部分文本是否超时
+        if self._stabilizing():
+            return self.stabilizer.time_until_stable()
+        if self.line_tracker is not None:
+            return self.line_tracker.time_until_expiry()
+        return None
+
+    async def _handle_text(self, text, text_queue):
+        # text 为 None 表示这次没有新的识别结果（等待到期）
+        if self.stabilizer is not None:
+            text = self.stabilizer.check() if text is None else self.stabilizer.feed(text)
+        if self.line_tracker is not None:
+            completed = []
+            if text is not None:
+                completed, pending = self.line_tracker.feed(text)
+                self._update_partial(pending)
+            # 画面持续刷新但文字不再增长时同样要按时提交；新文本还在等待稳定时暂不提交
+            if not self._stabilizing():
+                completed += self.line_tracker.flush_expired()
+            new_original = ' '.join(completed)
+        elif text is not None:
+            new_original, new_sentences = find_new_sentences(text, self.last_sentences)
+            if new_original.strip():
+                self.last_sentences.extend(new_sentences)
+        else:
+            return
+        await self._submit_text(new_original, text_queue)
+
+    async def _submit_text(self, new_original, text_queue):
+        if new_original.strip():
+            self._text_changed = True
+            entry = self.transcript.append(new_original)
+            self._untranslated.add(entry.id)
+            if self.on_original is not None:
+                self.on_original(entry.id, new_original)
+            # 文本队列满时在此等待，形成反压
+            await text_queue.put((entry.id, new_original))
+
+    def _update_partial(self, pending):
+        # 部分文本只在界面上显示，不发起翻译请求
+        if pending != self.pending_text:
+            self.pending_text = pending
+            if self.on_partial is not None:
+                self.on_partial(pending)
+
+    async def _translate_stage(self, text_queue, pending_queue, translation_slots):
+        while True:
+            item = await text_queue.get()
+            if item is _STOP:
+                break
+            entry_id, original = item
+            # 同时进行的翻译请求达到上限时在此等待，文本队列随之积压并反压 OCR 阶段
+            await translation_slots.acquire()
+            task = asyncio.create_task(translate_text(original, src=self.translate_src,
+                                                      dest=self.translate_dest))
+            task.add_done_callback(lambda _: translation_slots.release())
+            pending_queue.put_nowait((entry_id, original, task))
+        pending_queue.put_nowait(_STOP)
+
+    async def _emit_stage(self, pending_queue):
+        while True:
+            item = await pending_queue.get()
+            if item is _STOP:
+                break
+            entry_id, original, task = item
+            new_translation = await task
+            if new_translation:
+                logging.info(f"新增原文: {original}")
+                logging.info(f"新增翻译: {new_translation}")
+                logging.info("-" * 50)
+            # 翻译失败时记为空译文，界面上显示为翻译失败
+            self._untranslated.discard(entry_id)
+            self.transcript.update(entry_id, new_translation or "")
+            if self.on_translation is not None:
+                self.on_translation(entry_id, new_translation or "")
+            if self.on_result is not None:
+                self.on_result(original, new_translation or "")
@@ -0,0 +1,36 @@
+class AdaptiveScheduler:
+    # 根据每轮处理耗时和字幕变化情况决定下一次捕获的等待时间：
+    # 字幕变化时按 min_interval 快速轮询，连续 idle_ticks 轮无变化后按 backoff 倍数退避到 max_interval；
+    # 同时保证处理时间占比不超过 cpu_budget。间隔按"开始到开始"计算，慢 OCR 不会造成积压。
+    def __init__(self, min_interval=0.15, max_interval=3.0, cpu_budget=0.3, backoff=1.5, idle_ticks=3):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("需要满足 0 < min_interval <= max_interval")
+        if not 0 < cpu_budget <= 1:
+            raise ValueError("cpu_budget 必须在 (0, 1] 范围内")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.backoff = backoff
+        self.idle_ticks = idle_ticks
+        self.interval = min_interval
+        self.busy_average = None
+        self._idle = 0
+
+    def next_delay(self, busy, changed):
+        # busy: 本轮捕获+处理耗时（秒）；changed: 本轮画面或文本是否发生变化
+        if self.busy_average is None:
+            self.busy_average = busy
+        else:
+            self.busy_average = 0.7 * self.busy_average + 0.3 * busy
+
+        if changed:
+            self._idle = 0
+            self.interval = self.min_interval
+        else:
+            self._idle += 1
+            if self._idle >= self.idle_ticks:
+                self.interval = min(self.max_interval, self.interval * self.backoff)
+
+        # 满足 CPU 预算所需的最短休眠：busy / (busy + sleep) <= cpu_budget
+        budget_sleep = self.busy_average * (1 - self.cpu_budget) / self.cpu_budget
+        return max(self.interval - busy, budget_sleep, 0.0)
@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+
+
+class FrameChangeDetector:
+    # 在 OCR 之前做廉价的画面变化检测：字幕区域没变化时直接跳过预处理和 OCR
+    # method='diff'：缩小后的灰度图与上一帧的绝对差，按 tile x tile 的小块求平均，
+    #   任意一块超过 threshold（0-255）视为变化。按块取最大值而不是整幅平均，
+    #   短句替换、追加一个词或句号这类只占一小块区域的变化也能检测到
+    # method='hash'：差值感知哈希 (dHash)，汉明距离超过 threshold（0-64）视为变化
+    def __init__(self, threshold=2.0, method='diff', sample_width=256, tile=4):
+        if method not in ('diff', 'hash'):
+            raise ValueError(f"未知的变化检测方法: {method}")
+        self.threshold = threshold
+        self.method = method
+        self.sample_width = sample_width
+        self.tile = tile
+        self._gray = None
+        self._small = None
+        self._previous = None
+        self._diff = None
+        self._tiles = None
+        self.frames = 0
+        self.skipped = 0
+        self.last_changed = False
+
+    def _downsample(self, frame):
+        if frame.ndim == 3:
+            if self._gray is None or self._gray.shape != frame.shape[:2]:
+                self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+            frame = self._gray
+        if self.method == 'hash':
+            size = (9, 8)
+        else:
+            h, w = frame.shape[:2]
+            width = min(self.sample_width, w)
+            size = (width, max(1, round(h * width / w)))
+        if self._small is None or self._small.shape != (size[1], size[0]):
+            self._small = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._previous = None
+        cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        return self._small
+
+    def _distance(self, small):
+        if self.method == 'hash':
+            bits = small[:, 1:] > small[:, :-1]
+            return int(np.count_nonzero(bits != self._previous)), bits
+        if self._diff is None or self._diff.shape != small.shape:
+            self._diff = np.empty_like(small)
+        cv2.absdiff(small, self._previous, dst=self._diff)
+        h, w = small.shape
+        size = (max(1, w // self.tile), max(1, h // self.tile))
+        if self._tiles is None or self._tiles.shape != (size[1], size[0]):
+            self._tiles = np.empty((size[1], size[0]), dtype=np.uint8)
+        cv2.resize(self._diff, size, dst=self._tiles, interpolation=cv2.INTER_AREA)
+        return float(self._tiles.max()), small.copy()
+
+    def has_changed(self, frame):
+        self.frames += 1
+        small = self._downsample(frame)
+        if self._previous is None:
+            self._previous = small[:, 1:] > small[:, :-1] if self.method == 'hash' else small.copy()
+            self.last_changed = True
+            return True
+        distance, signature = self._distance(small)
+        if distance <= self.threshold:
+            self.skipped += 1
+            self.last_changed = False
+            return False
+        self._previous = signature
+        self.last_changed = True
+        return True
+
+    def reset(self):
+        # 捕获区域或预处理设置改变后调用，下一帧一定会送去 OCR
+        self._previous = None
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+
+class TextPresenceDetector:
+    # OCR 之前判断画面里有没有文字，台词之间的空白字幕区域直接跳过 OCR。
+    # 在缩小后的灰度图上统计水平方向的强边缘：文字的一行中笔画边缘成串出现，
+    # 某一行的边缘数不少于 min_edges 即认为有文字；纯色背景、单条边框和轻微噪点都达不到。
+    def __init__(self, edge_threshold=40, min_edges=6, scale=4):
+        self.edge_threshold = edge_threshold
+        self.min_edges = min_edges
+        self.scale = scale
+        self._small = None
+        self._gray = None
+        self._diff = None
+        self.frames = 0
+        self.empty = 0
+        self.last_has_text = False
+
+    def _downsample(self, frame):
+        # 先用线性插值缩小再转灰度，整帧只读一遍；字幕很矮时少缩一些，保证文字还有几个像素高
+        h, w = frame.shape[:2]
+        scale = max(1, min(self.scale, h // 16))
+        size = (max(2, w // scale), max(1, h // scale))
+        if self._small is None or self._small.shape[:2] != (size[1], size[0]) or self._small.ndim != frame.ndim:
+            self._small = np.empty((size[1], size[0]) + frame.shape[2:], dtype=np.uint8)
+            self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._diff = np.empty((size[1], size[0] - 1), dtype=np.uint8)
+        cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_LINEAR)
+        if frame.ndim == 3:
+            return cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._small
+
+    def has_text(self, frame):
+        self.frames += 1
+        small = self._downsample(frame)
+        cv2.absdiff(small[:, 1:], small[:, :-1], dst=self._diff)
+        edges = cv2.reduce((self._diff > self.edge_threshold).view(np.uint8), 1, cv2.REDUCE_SUM,
+                           dtype=cv2.CV_32S)
+        self.last_has_text = bool(edges.max() >= self.min_edges) if edges.size else False
+        if not self.last_has_text:
+            self.empty += 1
+        return self.last_has_text
+
+    @property
+    def empty_ratio(self):
+        return self.empty / self.frames if self.frames else 0.0
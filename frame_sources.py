@@ -0,0 +1,224 @@
+import glob
+import logging
+import os
+
+import cv2
+import numpy as np
+
+try:
+    import mss
+except ImportError:  # 没有 mss 时退回 pyautogui
+    mss = None
+
+
+class FrameSource:
+    # 帧源基类：grab() 返回 BGR 格式的 np.ndarray，没有更多帧时返回 None。
+    # 注意：为避免每帧分配内存，返回的数组可能在下一次 grab() 时被覆盖，
+    # 需要保留帧的调用方请自行 copy()。
+    def open(self):
+        pass
+
+    def grab(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ScreenFrameSource(FrameSource):
+    # 持久化的屏幕抓取器：整个 CaptionThread 生命周期内保持显示句柄和输出缓冲区
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self._sct = None
+        self._monitor = {'left': x, 'top': y, 'width': width, 'height': height}
+        self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+    def open(self):
+        # mss 的句柄与线程绑定，必须在调用 grab() 的线程中打开
+        if self._sct is None and mss is not None:
+            self._sct = mss.mss()
+
+    def grab(self):
+        if self._sct is None:
+            self.open()
+        if self._sct is not None:
+            shot = self._sct.grab(self._monitor)
+            bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._ensure_buffer(bgra.shape))
+        else:
+            import pyautogui
+            screenshot = np.asarray(pyautogui.screenshot(region=(self.x, self.y, self.width, self.height)))
+            cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR, dst=self._ensure_buffer(screenshot.shape))
+        return self._buffer
+
+    def _ensure_buffer(self, shape):
+        # 高 DPI 缩放或区域超出屏幕被裁剪时，截图尺寸与请求的区域不同；
+        # dst 尺寸不符时 OpenCV 会另外分配数组而不写入 dst，因此按实际尺寸重新分配缓冲区
+        if self._buffer.shape[:2] != shape[:2]:
+            self._buffer = np.empty((shape[0], shape[1], 3), dtype=np.uint8)
+        return self._buffer
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+class FileFrameSource(FrameSource):
+    # 从视频文件读取帧，用于无界面环境下的基准测试
+    def __init__(self, path, region=None, loop=False):
+        self.path = path
+        self.region = region
+        self.loop = loop
+        self._cap = None
+        self._buffer = None
+
+    def open(self):
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self.path)
+            if not self._cap.isOpened():
+                raise IOError(f"无法打开视频文件: {self.path}")
+
+    def grab(self):
+        if self._cap is None:
+            self.open()
+        ok, self._buffer = self._cap.read(self._buffer)
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, self._buffer = self._cap.read(self._buffer)
+        if not ok:
+            return None
+        return _crop(self._buffer, self.region)
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class ImageSequenceFrameSource(FrameSource):
+    # 按文件名顺序读取图片序列；pattern 可以是目录或通配符
+    def __init__(self, pattern, region=None, loop=False, preload=True):
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*')
+        self.paths = sorted(p for p in glob.glob(pattern)
+                            if p.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+        if not self.paths:
+            raise IOError(f"没有找到图片: {pattern}")
+        self.region = region
+        self.loop = loop
+        self.preload = preload
+        self._frames = None
+        self._index = 0
+
+    def open(self):
+        # 预先加载到内存，基准测试时不把磁盘读取计入抓取耗时
+        if self.preload and self._frames is None:
+            self._frames = [self._read(p) for p in self.paths]
+
+    def _read(self, path):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise IOError(f"无法读取图片: {path}")
+        return _crop(image, self.region)
+
+    def grab(self):
+        if self._index >= len(self.paths):
+            if not self.loop:
+                return None
+            self._index = 0
+        if self.preload:
+            self.open()
+            frame = self._frames[self._index]
+        else:
+            frame = self._read(self.paths[self._index])
+        self._index += 1
+        return frame
+
+    def close(self):
+        self._frames = None
+        self._index = 0
+
+
+class SyntheticFrameSource(FrameSource):
+    # 合成字幕帧：每 hold_frames 帧切换一行文字，用于可重复的基准测试
+    def __init__(self, width=800, height=80, lines=None, hold_frames=10, blank_frames=0,
+                 noise=0, max_frames=None, seed=0):
+        self.width = width
+        self.height = height
+        self.lines = lines or [
+            "The quick brown fox jumps over the lazy dog.",
+            "Live captions are rendered here.",
+            "Nothing changes while the speaker pauses.",
+        ]
+        self.hold_frames = hold_frames
+        self.blank_frames = blank_frames
+        self.noise = noise
+        self.max_frames = max_frames
+        self._rng = np.random.default_rng(seed)
+        self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+        self._rendered = {}
+        self._count = 0
+
+    @property
+    def current_text(self):
+        # 当前帧对应的真实文本（空白帧为空字符串），供基准测试计算准确率
+        period = self.hold_frames + self.blank_frames
+        index, offset = divmod(max(self._count - 1, 0), period)
+        if offset >= self.hold_frames:
+            return ""
+        return self.lines[index % len(self.lines)]
+
+    def _render(self, text):
+        if text not in self._rendered:
+            image = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            if text:
+                scale = self.height / 80
+                cv2.putText(image, text, (10, int(self.height * 0.65)), cv2.FONT_HERSHEY_SIMPLEX,
+                            scale, (255, 255, 255), max(1, int(2 * scale)), cv2.LINE_AA)
+            self._rendered[text] = image
+        return self._rendered[text]
+
+    def grab(self):
+        if self.max_frames is not None and self._count >= self.max_frames:
+            return None
+        self._count += 1
+        np.copyto(self._buffer, self._render(self.current_text))
+        if self.noise:
+            noise = self._rng.integers(0, self.noise + 1, size=self._buffer.shape, dtype=np.uint8)
+            cv2.add(self._buffer, noise, dst=self._buffer)
+        return self._buffer
+
+
+def _crop(image, region):
+    if region is None:
+        return image
+    x, y, width, height = region
+    return image[y:y + height, x:x + width]
+
+
+def create_frame_source(spec, region=None, **kwargs):
+    # spec 形如 "screen"、"file:video.mp4"、"images:frames/*.png"、"synthetic"
+    kind, _, arg = spec.partition(':')
+    if kind == 'screen':
+        if region is None:
+            raise ValueError("屏幕帧源需要指定捕获区域")
+        return ScreenFrameSource(*region)
+    if kind == 'file':
+        return FileFrameSource(arg, region=region, **kwargs)
+    if kind == 'images':
+        return ImageSequenceFrameSource(arg, region=region, **kwargs)
+    if kind == 'synthetic':
+        return SyntheticFrameSource(**kwargs)
+    logging.error(f"未知的帧源类型: {spec}")
+    raise ValueError(f"未知的帧源类型: {spec}")
@@ -3,14 +3,27 @@ import os
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                              QTextEdit, QLabel, QMessageBox, QInputDialog, QStyleFactory, QDialog, 
                              QSlider, QDialogButtonBox, QShortcut, QStatusBar, QComboBox, QCheckBox,
-                             QLineEdit, QGridLayout, QProgressDialog, QSplitter, QAction, QTabWidget)
+                             QLineEdit, QGridLayout, QProgressDialog, QSplitter, QAction, QTabWidget,
+                             QSpinBox)
 from PyQt5.QtCore import QThread, pyqtSignal, Qt, QSettings, QTimer
 from PyQt5.QtGui import QCursor, QPalette, QColor, QKeySequence
 import asyncio
 import pyautogui
 import winreg
 import logging
-from windows_live_captions import check_tesseract, capture_and_process_captions, preprocess_image
+from windows_live_captions import (check_tesseract, preprocess_image, translation_cache,
+                                   open_disk_cache, close_disk_cache, translation_batcher)
+from caption_pipeline import CaptionPipeline
+from frame_sources import ScreenFrameSource, SyntheticFrameSource
+from frame_gate import FrameChangeDetector, TextPresenceDetector
+from subtitle_tracking import TextStabilizer
+from transcript_store import TranscriptStore, prune_sessions
+from transcript_view import TranscriptModel, TranscriptView, UpdateCoalescer
+from subtitle_overlay import SubtitleOverlay
+from capture_scheduler import AdaptiveScheduler
+from ocr_engine import create_ocr_engine
+from preprocessing import DENOISE_MODES, measure_denoise_cost
+import cv2
 import time
 import traceback
 
@@ -33,10 +46,16 @@ logging.basicConfig(filename=log_file, level=logging.DEBUG,
 logging.info("程序启动")
 
 class CaptionThread(QThread):
-    update_signal = pyqtSignal(str, str)
+    # 两步发出的字幕事件：(编号, 原文) 和 (编号, 译文)，编号为会话记录中的条目编号
+    original_signal = pyqtSignal(int, str)
+    translation_signal = pyqtSignal(int, str)
+    partial_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
 
-    def __init__(self, x, y, width, height, preprocess_options, ocr_lang, translate_src, translate_dest):
+    def __init__(self, x, y, width, height, preprocess_options, ocr_lang, translate_src, translate_dest,
+                 change_threshold=2, min_interval=0.15, max_interval=3.0, cpu_budget=0.3, text_detection=True,
+                 dedup_threshold=0.85, growing_lines=False, line_timeout=1.5, stable_frames=2, stable_time=0.25,
+                 transcript=None):
         super().__init__()
         self.x = x
         self.y = y
@@ -48,24 +67,41 @@ class CaptionThread(QThread):
         self.translate_src = translate_src
         self.translate_dest = translate_dest
         self.start_time = None
+        self.frame_source = None
+        self.ocr_engine = None
+        self.pipeline = None
+        self.change_detector = FrameChangeDetector(threshold=change_threshold)
+        self.text_detector = TextPresenceDetector() if text_detection else None
+        self.dedup_threshold = dedup_threshold
+        self.growing_lines = growing_lines
+        self.line_timeout = line_timeout
+        self.stabilizer = TextStabilizer(frames=stable_frames, duration=stable_time)
+        self.transcript = transcript
+        self.scheduler = AdaptiveScheduler(min_interval, max_interval, cpu_budget)
 
     async def run_async(self):
         self.start_time = time.time()
-        last_sentences = []
-        last_translation = ""
-        while self.running:
-            try:
-                last_sentences, last_translation, new_original, new_translation = await capture_and_process_captions(
-                    self.x, self.y, self.width, self.height, last_sentences, last_translation, 
-                    self.preprocess_options, self.ocr_lang, self.translate_src, self.translate_dest
-                )
-                if new_original or new_translation:
-                    self.update_signal.emit(new_original, new_translation)
-            except Exception as e:
-                self.error_signal.emit(str(e))
-                logging.error(f"Error in caption thread: {str(e)}")
-                break
-            await asyncio.sleep(1)
+        # 帧源由流水线在捕获线程内打开，整个捕获期间复用同一个显示句柄和缓冲区
+        self.frame_source = ScreenFrameSource(self.x, self.y, self.width, self.height)
+        # 语言包在线程启动时加载一次，之后每帧直接在进程内识别
+        self.ocr_engine = create_ocr_engine(self.ocr_lang)
+        self.pipeline = CaptionPipeline(
+            self.frame_source, self.preprocess_options, self.ocr_lang, self.translate_src, self.translate_dest,
+            None, change_detector=self.change_detector, ocr_engine=self.ocr_engine,
+            scheduler=self.scheduler, text_detector=self.text_detector, dedup_threshold=self.dedup_threshold,
+            growing_lines=self.growing_lines, line_timeout=self.line_timeout, on_partial=self.partial_signal.emit,
+            stabilizer=self.stabilizer, transcript=self.transcript,
+            on_original=self.original_signal.emit, on_translation=self.translation_signal.emit
+        )
+        if not self.running:
+            self.pipeline.stop()
+        try:
+            await self.pipeline.run()
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            logging.error(f"Error in caption thread: {str(e)}")
+        finally:
+            self.ocr_engine.close()
 
     def run(self):
         try:
@@ -76,6 +112,8 @@ class CaptionThread(QThread):
 
     def stop(self):
         self.running = False
+        if self.pipeline is not None:
+            self.pipeline.stop()
 
     @property
     def elapsed_time(self):
@@ -150,12 +188,121 @@ class SettingsDialog(QDialog):
             'grayscale': QCheckBox("灰度化"),
             'denoise': QCheckBox("去噪"),
             'threshold': QCheckBox("二值化"),
-            'deskew': QCheckBox("倾斜校正")
+            'deskew': QCheckBox("倾斜校正"),
+            'color_key': QCheckBox("按字幕颜色提取文字（白/黄字幕加深色描边）"),
+            'normalize_height': QCheckBox("文字高度归一化（缩放到 OCR 最佳字高）"),
+            'crop_text': QCheckBox("只识别文字所在区域（无文字时跳过 OCR）")
         }
         
         for checkbox in self.preprocess_options.values():
             preprocess_layout.addWidget(checkbox)
 
+        # 去噪方式及其在当前捕获区域大小下的单帧耗时
+        self.denoise_mode = QComboBox()
+        for mode, name in DENOISE_MODES.items():
+            self.denoise_mode.addItem(name, mode)
+        self.denoise_cost_label = QLabel()
+        self.denoise_mode.currentIndexChanged.connect(self.update_denoise_cost)
+        self.preprocess_options['grayscale'].toggled.connect(self.update_denoise_cost)
+        denoise_layout = QHBoxLayout()
+        denoise_layout.addWidget(QLabel("去噪方式:"))
+        denoise_layout.addWidget(self.denoise_mode)
+        denoise_layout.addWidget(self.denoise_cost_label)
+        preprocess_layout.addLayout(denoise_layout)
+
+        # 画面变化检测灵敏度：数值越小越灵敏，画面变化低于阈值时跳过 OCR
+        self.change_threshold_slider = QSlider(Qt.Horizontal)
+        self.change_threshold_slider.setMinimum(0)
+        self.change_threshold_slider.setMaximum(20)
+        self.change_threshold_slider.setValue(2)
+        self.change_threshold_label = QLabel("画面变化阈值: 2")
+        self.change_threshold_slider.valueChanged.connect(self.update_change_threshold_label)
+        preprocess_layout.addWidget(self.change_threshold_label)
+        preprocess_layout.addWidget(self.change_threshold_slider)
+
+        # 台词之间字幕区域为空时跳过 OCR
+        self.text_detection_checkbox = QCheckBox("快速检测有无文字，无文字时跳过 OCR")
+        preprocess_layout.addWidget(self.text_detection_checkbox)
+
+        # 捕获频率选项卡
+        schedule_tab = QWidget()
+        schedule_layout = QGridLayout(schedule_tab)
+        tab_widget.addTab(schedule_tab, "捕获频率")
+
+        self.min_interval_spin = QSpinBox()
+        self.min_interval_spin.setRange(50, 5000)
+        self.min_interval_spin.setSingleStep(50)
+        self.min_interval_spin.setSuffix(" 毫秒")
+        self.max_interval_spin = QSpinBox()
+        self.max_interval_spin.setRange(100, 30000)
+        self.max_interval_spin.setSingleStep(500)
+        self.max_interval_spin.setSuffix(" 毫秒")
+        self.cpu_budget_spin = QSpinBox()
+        self.cpu_budget_spin.setRange(5, 100)
+        self.cpu_budget_spin.setSuffix(" %")
+
+        schedule_layout.addWidget(QLabel("字幕变化时的捕获间隔:"), 0, 0)
+        schedule_layout.addWidget(self.min_interval_spin, 0, 1)
+        schedule_layout.addWidget(QLabel("字幕静止时的最大间隔:"), 1, 0)
+        schedule_layout.addWidget(self.max_interval_spin, 1, 1)
+        schedule_layout.addWidget(QLabel("CPU 占用预算:"), 2, 0)
+        schedule_layout.addWidget(self.cpu_budget_spin, 2, 1)
+
+        # 字幕去重选项卡
+        subtitle_tab = QWidget()
+        subtitle_layout = QGridLayout(subtitle_tab)
+        tab_widget.addTab(subtitle_tab, "字幕处理")
+
+        # 与最近字幕的相似度达到该值时视为 OCR 抖动造成的重复，不再翻译
+        self.dedup_similarity_spin = QSpinBox()
+        self.dedup_similarity_spin.setRange(50, 100)
+        self.dedup_similarity_spin.setSuffix(" %")
+
+        # 增量字幕（逐词出现）：句子结束或超时后才翻译，之前只显示正在输入的原文
+        self.growing_lines_checkbox = QCheckBox("增量字幕模式（字幕逐词出现，如 Windows 实时字幕）")
+        self.line_timeout_spin = QSpinBox()
+        self.line_timeout_spin.setRange(300, 10000)
+        self.line_timeout_spin.setSingleStep(100)
+        self.line_timeout_spin.setSuffix(" 毫秒")
+
+        subtitle_layout.addWidget(QLabel("重复字幕相似度:"), 0, 0)
+        subtitle_layout.addWidget(self.dedup_similarity_spin, 0, 1)
+        subtitle_layout.addWidget(self.growing_lines_checkbox, 1, 0, 1, 2)
+        subtitle_layout.addWidget(QLabel("未结束句子的提交超时:"), 2, 0)
+        subtitle_layout.addWidget(self.line_timeout_spin, 2, 1)
+
+        # 多帧稳定：同一文本连续出现若干帧或持续一段时间后才翻译，过滤淡入淡出时的乱码
+        self.stable_frames_spin = QSpinBox()
+        self.stable_frames_spin.setRange(1, 10)
+        self.stable_frames_spin.setSuffix(" 帧")
+        self.stable_ms_spin = QSpinBox()
+        self.stable_ms_spin.setRange(0, 3000)
+        self.stable_ms_spin.setSingleStep(50)
+        self.stable_ms_spin.setSuffix(" 毫秒")
+
+        subtitle_layout.addWidget(QLabel("字幕稳定所需帧数:"), 3, 0)
+        subtitle_layout.addWidget(self.stable_frames_spin, 3, 1)
+        subtitle_layout.addWidget(QLabel("或持续不变的时间:"), 4, 0)
+        subtitle_layout.addWidget(self.stable_ms_spin, 4, 1)
+
+        # 字幕列表在内存中保留的条数，更早的记录滚动到顶部时从会话文件读回
+        self.transcript_rows_spin = QSpinBox()
+        self.transcript_rows_spin.setRange(100, 10000)
+        self.transcript_rows_spin.setSingleStep(100)
+        self.transcript_rows_spin.setSuffix(" 条")
+        subtitle_layout.addWidget(QLabel("字幕列表保留条数:"), 5, 0)
+        subtitle_layout.addWidget(self.transcript_rows_spin, 5, 1)
+        # transcripts 目录中保留的会话记录文件数，更早的会话在开始捕获时删除
+        self.transcript_sessions_spin = QSpinBox()
+        self.transcript_sessions_spin.setRange(1, 1000)
+        self.transcript_sessions_spin.setSuffix(" 个")
+        subtitle_layout.addWidget(QLabel("保留的会话记录:"), 7, 0)
+        subtitle_layout.addWidget(self.transcript_sessions_spin, 7, 1)
+
+        # 字幕浮层：在屏幕底部以置顶、鼠标穿透的透明窗口显示最近的译文
+        self.overlay_checkbox = QCheckBox("在屏幕上叠加显示译文（浮层）")
+        subtitle_layout.addWidget(self.overlay_checkbox, 6, 0, 1, 2)
+
         # 确定和取消按钮
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         button_box.accepted.connect(self.accept)
@@ -165,6 +312,25 @@ class SettingsDialog(QDialog):
     def update_font_size_label(self, value):
         self.font_size_label.setText(f"字体大小: {value}")
 
+    def update_change_threshold_label(self, value):
+        self.change_threshold_label.setText(f"画面变化阈值: {value}")
+
+    def update_denoise_cost(self):
+        # 在界面线程中测量，只用不超过 320x80 的带噪合成帧，再按面积换算到捕获区域大小，
+        # 非局部均值这类很慢的方式只测一次，打开设置时不会卡住界面
+        capture_area = getattr(self.parent(), 'capture_area', None)
+        width, height = (capture_area[2], capture_area[3]) if capture_area else (800, 80)
+        width, height = max(width, 1), max(height, 1)
+        sample_width, sample_height = min(width, 320), min(height, 80)
+        sample = SyntheticFrameSource(sample_width, sample_height, noise=30).grab()
+        mode = self.denoise_mode.currentData()
+        # 多帧时间平均在变化检测之前作用于每一帧彩色原始画面，其余方式在灰度化之后处理送去 OCR 的帧
+        if self.preprocess_options['grayscale'].isChecked() and mode != 'temporal':
+            sample = cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY)
+        cost = measure_denoise_cost(mode, sample, repeats=1 if mode == 'nlmeans' else 3)
+        cost *= (width * height) / (sample_width * sample_height)
+        self.denoise_cost_label.setText(f"每帧耗时: 约 {cost:.1f} 毫秒")
+
 class TranslateThread(QThread):
     finished = pyqtSignal(str, str)
     progress = pyqtSignal(int)
@@ -222,12 +388,39 @@ class MainWindow(QMainWindow):
                 'grayscale': self.settings.value("preprocess_grayscale", False, type=bool),
                 'denoise': self.settings.value("preprocess_denoise", False, type=bool),
                 'threshold': self.settings.value("preprocess_threshold", False, type=bool),
-                'deskew': self.settings.value("preprocess_deskew", False, type=bool)
+                'deskew': self.settings.value("preprocess_deskew", False, type=bool),
+                'color_key': self.settings.value("preprocess_color_key", False, type=bool),
+                'normalize_height': self.settings.value("preprocess_normalize_height", False, type=bool),
+                'crop_text': self.settings.value("preprocess_crop_text", False, type=bool),
+                'denoise_mode': self.settings.value("preprocess_denoise_mode", "median")
+            }
+            self.change_threshold = self.settings.value("change_threshold", 2, type=int)
+            self.text_detection = self.settings.value("text_detection", True, type=bool)
+            self.subtitle_options = {
+                'dedup_similarity': self.settings.value("subtitle_dedup_similarity", 85, type=int),
+                'growing_lines': self.settings.value("subtitle_growing_lines", False, type=bool),
+                'line_timeout_ms': self.settings.value("subtitle_line_timeout_ms", 1500, type=int),
+                'stable_frames': self.settings.value("subtitle_stable_frames", 2, type=int),
+                'stable_ms': self.settings.value("subtitle_stable_ms", 250, type=int),
+                'transcript_rows': self.settings.value("subtitle_transcript_rows", 500, type=int),
+                'transcript_sessions': self.settings.value("subtitle_transcript_sessions", 20, type=int),
+                'overlay': self.settings.value("subtitle_overlay", False, type=bool)
+            }
+            self.schedule_options = {
+                'min_interval_ms': self.settings.value("schedule_min_interval_ms", 150, type=int),
+                'max_interval_ms': self.settings.value("schedule_max_interval_ms", 3000, type=int),
+                'cpu_budget': self.settings.value("schedule_cpu_budget", 30, type=int)
             }
 
             self.source_language = self.settings.value("source_language", "日语")
             self.target_language = self.settings.value("target_language", "中文")
 
+            # 打开磁盘翻译缓存，把最近使用的翻译预热到内存
+            try:
+                open_disk_cache(os.path.join(current_dir, 'translation_cache.db'))
+            except Exception as e:
+                logging.error(f"打开磁盘翻译缓存失败: {str(e)}")
+
             # 设置应用程序样式
             self.set_style()
 
@@ -262,15 +455,24 @@ class MainWindow(QMainWindow):
             self.settings_button.clicked.connect(self.open_settings)
             button_layout.addWidget(self.settings_button)
 
-            self.original_text = QTextEdit()
-            self.original_text.setReadOnly(True)
-            realtime_layout.addWidget(QLabel("实时原文:"))
-            realtime_layout.addWidget(self.original_text)
-
-            self.translated_text = QTextEdit()
-            self.translated_text.setReadOnly(True)
-            realtime_layout.addWidget(QLabel("实时翻译:"))
-            realtime_layout.addWidget(self.translated_text)
+            # 字幕列表：每行为一条原文和译文，只绘制可见的行，内存中最多保留设置的条数，更早的记录从会话文件读回
+            self.transcript_model = TranscriptModel(max_rows=self.subtitle_options['transcript_rows'])
+            self.transcript_view = TranscriptView()
+            self.transcript_view.setModel(self.transcript_model)
+            # 字幕线程发来的更新先缓冲，再按界面刷新率批量应用
+            self.update_coalescer = UpdateCoalescer(self.apply_updates, rate=30, parent=self)
+            realtime_layout.addWidget(QLabel("实时原文 / 翻译:"))
+            realtime_layout.addWidget(self.transcript_view)
+
+            # 增量字幕模式下正在输入、尚未提交翻译的原文
+            self.partial_label = QLabel()
+            self.partial_label.setWordWrap(True)
+            self.partial_label.setStyleSheet("color: gray;")
+            realtime_layout.addWidget(self.partial_label)
+
+            # 字幕浮层，只在译文变化时重绘
+            self.subtitle_overlay = SubtitleOverlay(font_size=self.font_size)
+            self.subtitle_overlay.place_on_screen()
 
             main_layout.addWidget(self.realtime_widget)
 
@@ -324,6 +526,8 @@ class MainWindow(QMainWindow):
             # 添加以下行来初始化 caption_thread
             self.caption_thread = None
             self.capture_area = None
+            # 当前会话的字幕记录，每次开始捕获时新建，停止后仍可查看
+            self.transcript = None
             self.progress_dialog = None
             self.translate_thread = None
 
@@ -397,7 +601,7 @@ class MainWindow(QMainWindow):
             QPushButton:pressed {{
                 background-color: #505050;
             }}
-            QTextEdit {{
+            QTextEdit, QListView {{
                 background-color: #1a1a1a;
                 border: 1px solid #5a5a5a;
                 font-size: {self.font_size}px;
@@ -428,7 +632,7 @@ class MainWindow(QMainWindow):
         
         # 添加浅色主题的样式表
         self.setStyleSheet(f"""
-            QTextEdit {{
+            QTextEdit, QListView {{
                 font-size: {self.font_size}px;
             }}
             QLabel {{
@@ -486,16 +690,45 @@ class MainWindow(QMainWindow):
             logging.error(f"Tesseract check failed: {str(e)}")
             return
 
+        # 每次捕获新建一个会话记录，溢出的旧字幕写入 transcripts 目录下的 JSON Lines 文件，
+        # 目录中只保留最近若干个会话（含本次）
+        if self.transcript is not None:
+            self.transcript.close()
+        transcript_dir = os.path.join(current_dir, 'transcripts')
+        prune_sessions(transcript_dir, max(0, self.subtitle_options['transcript_sessions'] - 1))
+        session_path = os.path.join(transcript_dir, time.strftime('session-%Y%m%d-%H%M%S.jsonl'))
+        try:
+            self.transcript = TranscriptStore(session_path)
+        except OSError as e:
+            logging.error(f"创建字幕记录文件失败: {str(e)}")
+            self.transcript = TranscriptStore()
+        self.transcript_model.set_store(self.transcript)
+
         x, y, width, height = self.capture_area
         self.caption_thread = CaptionThread(x, y, width, height, self.preprocess_options, 
-                                            self.source_language, self.translate_src, self.translate_dest)
-        self.caption_thread.update_signal.connect(self.update_text)
+                                            self.source_language, self.translate_src, self.translate_dest,
+                                            change_threshold=self.change_threshold,
+                                            text_detection=self.text_detection,
+                                            dedup_threshold=self.subtitle_options['dedup_similarity'] / 100,
+                                            growing_lines=self.subtitle_options['growing_lines'],
+                                            line_timeout=self.subtitle_options['line_timeout_ms'] / 1000,
+                                            stable_frames=self.subtitle_options['stable_frames'],
+                                            stable_time=self.subtitle_options['stable_ms'] / 1000,
+                                            transcript=self.transcript,
+                                            min_interval=self.schedule_options['min_interval_ms'] / 1000,
+                                            max_interval=self.schedule_options['max_interval_ms'] / 1000,
+                                            cpu_budget=self.schedule_options['cpu_budget'] / 100)
+        self.caption_thread.original_signal.connect(self.add_original)
+        self.caption_thread.translation_signal.connect(self.add_translation)
+        self.caption_thread.partial_signal.connect(self.update_partial_text)
         self.caption_thread.error_signal.connect(self.show_error)  # 连接错误信号
         self.caption_thread.start()
 
         self.select_area_button.setEnabled(False)
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
+        if self.subtitle_options['overlay']:
+            self.subtitle_overlay.show()
         self.statusBar.showMessage("正在捕获...")
 
     def stop_capture(self):
@@ -504,17 +737,39 @@ class MainWindow(QMainWindow):
             self.caption_thread.stop()
             self.caption_thread.wait()
             self.caption_thread = None
+        self.partial_label.setText("")
+        self.subtitle_overlay.clear()
+        self.subtitle_overlay.hide()
 
         self.select_area_button.setEnabled(True)
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.statusBar.showMessage("捕获已停止")
 
-    def update_text(self, original, translated):
-        if original:
-            self.original_text.append(original)
-        if translated:
-            self.translated_text.append(translated)
+    def add_original(self, entry_id, original):
+        self.update_coalescer.push('original', entry_id, original)
+
+    def add_translation(self, entry_id, translation):
+        self.update_coalescer.push('translation', entry_id, translation)
+
+    def update_partial_text(self, text):
+        self.update_coalescer.push('partial', text)
+
+    def apply_updates(self, events):
+        # 每次最多 30 Hz：字幕已由流水线写入会话记录，列表一次性读取所有新增条目，
+        # 再按编号刷新译文已返回的行；部分文本只显示最新的
+        if any(event[0] == 'original' for event in events):
+            self.transcript_model.sync()
+        for event in events:
+            if event[0] == 'translation':
+                self.transcript_model.update_entry(event[1])
+        if self.subtitle_overlay.isVisible():
+            for event in events:
+                if event[0] == 'translation':
+                    self.subtitle_overlay.show_text(event[2])
+        partials = [event[1] for event in events if event[0] == 'partial']
+        if partials:
+            self.partial_label.setText(f"正在输入: {partials[-1]}" if partials[-1] else "")
 
     def show_error(self, error_message):
         QMessageBox.critical(self, "错误", error_message)
@@ -523,6 +778,11 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.stop_capture()
+        close_disk_cache()
+        translation_batcher.close()
+        if self.transcript is not None:
+            self.transcript.close()
+        self.subtitle_overlay.close()
         event.accept()
 
     def open_settings(self):
@@ -532,8 +792,28 @@ class MainWindow(QMainWindow):
         dialog.shortcut_start.setText(self.shortcuts['start'])
         dialog.shortcut_stop.setText(self.shortcuts['stop'])
         dialog.shortcut_settings.setText(self.shortcuts['settings'])
+        # 填充选项时暂停信号，去噪耗时只在最后测量一次
+        dialog.denoise_mode.blockSignals(True)
+        dialog.preprocess_options['grayscale'].blockSignals(True)
         for key, checkbox in dialog.preprocess_options.items():
             checkbox.setChecked(self.preprocess_options[key])
+        dialog.denoise_mode.setCurrentIndex(max(0, dialog.denoise_mode.findData(self.preprocess_options['denoise_mode'])))
+        dialog.denoise_mode.blockSignals(False)
+        dialog.preprocess_options['grayscale'].blockSignals(False)
+        dialog.update_denoise_cost()
+        dialog.change_threshold_slider.setValue(self.change_threshold)
+        dialog.text_detection_checkbox.setChecked(self.text_detection)
+        dialog.min_interval_spin.setValue(self.schedule_options['min_interval_ms'])
+        dialog.max_interval_spin.setValue(self.schedule_options['max_interval_ms'])
+        dialog.cpu_budget_spin.setValue(self.schedule_options['cpu_budget'])
+        dialog.dedup_similarity_spin.setValue(self.subtitle_options['dedup_similarity'])
+        dialog.growing_lines_checkbox.setChecked(self.subtitle_options['growing_lines'])
+        dialog.line_timeout_spin.setValue(self.subtitle_options['line_timeout_ms'])
+        dialog.stable_frames_spin.setValue(self.subtitle_options['stable_frames'])
+        dialog.stable_ms_spin.setValue(self.subtitle_options['stable_ms'])
+        dialog.transcript_rows_spin.setValue(self.subtitle_options['transcript_rows'])
+        dialog.transcript_sessions_spin.setValue(self.subtitle_options['transcript_sessions'])
+        dialog.overlay_checkbox.setChecked(self.subtitle_options['overlay'])
 
         dialog.source_language.setCurrentText(self.source_language)
         dialog.target_language.setCurrentText(self.target_language)
@@ -553,6 +833,34 @@ class MainWindow(QMainWindow):
             for key, checkbox in dialog.preprocess_options.items():
                 self.preprocess_options[key] = checkbox.isChecked()
                 self.settings.setValue(f"preprocess_{key}", checkbox.isChecked())
+            self.preprocess_options['denoise_mode'] = dialog.denoise_mode.currentData()
+            self.settings.setValue("preprocess_denoise_mode", self.preprocess_options['denoise_mode'])
+            self.change_threshold = dialog.change_threshold_slider.value()
+            self.settings.setValue("change_threshold", self.change_threshold)
+            self.text_detection = dialog.text_detection_checkbox.isChecked()
+            self.settings.setValue("text_detection", self.text_detection)
+
+            self.schedule_options['min_interval_ms'] = dialog.min_interval_spin.value()
+            self.schedule_options['max_interval_ms'] = max(dialog.max_interval_spin.value(),
+                                                           dialog.min_interval_spin.value())
+            self.schedule_options['cpu_budget'] = dialog.cpu_budget_spin.value()
+            for key, value in self.schedule_options.items():
+                self.settings.setValue(f"schedule_{key}", value)
+
+            self.subtitle_options['dedup_similarity'] = dialog.dedup_similarity_spin.value()
+            self.subtitle_options['growing_lines'] = dialog.growing_lines_checkbox.isChecked()
+            self.subtitle_options['line_timeout_ms'] = dialog.line_timeout_spin.value()
+            self.subtitle_options['stable_frames'] = dialog.stable_frames_spin.value()
+            self.subtitle_options['stable_ms'] = dialog.stable_ms_spin.value()
+            self.subtitle_options['transcript_rows'] = dialog.transcript_rows_spin.value()
+            self.subtitle_options['transcript_sessions'] = dialog.transcript_sessions_spin.value()
+            self.subtitle_options['overlay'] = dialog.overlay_checkbox.isChecked()
+            self.transcript_model.max_rows = self.subtitle_options['transcript_rows']
+            self.subtitle_overlay.set_font_size(self.font_size)
+            if self.caption_thread is not None:
+                self.subtitle_overlay.setVisible(self.subtitle_options['overlay'])
+            for key, value in self.subtitle_options.items():
+                self.settings.setValue(f"subtitle_{key}", value)
             
             self.source_language = dialog.source_language.currentText()
             self.target_language = dialog.target_language.currentText()
@@ -568,7 +876,23 @@ class MainWindow(QMainWindow):
     def update_status(self):
         if hasattr(self, 'caption_thread') and self.caption_thread and self.caption_thread.isRunning():
             elapsed_time = self.caption_thread.elapsed_time
-            self.statusBar.showMessage(f"正在捕获... 已运行 {elapsed_time:.1f} 秒")
+            detector = self.caption_thread.change_detector
+            interval = self.caption_thread.scheduler.interval
+            pipeline = self.caption_thread.pipeline
+            dropped = pipeline.dropped_frames if pipeline else 0
+            text_detector = self.caption_thread.text_detector
+            empty_frames = text_detector.empty if text_detector else 0
+            stabilizer = self.caption_thread.stabilizer
+            cache_stats = translation_cache.stats()
+            self.statusBar.showMessage(f"正在捕获... 已运行 {elapsed_time:.1f} 秒 | "
+                                       f"跳过未变化帧 {detector.skipped}/{detector.frames} | "
+                                       f"无文字帧 {empty_frames} | "
+                                       f"丢弃积压帧 {dropped} | "
+                                       f"未稳定丢弃 {stabilizer.avoided}, 稳定延迟 {stabilizer.mean_latency * 1000:.0f} 毫秒 | "
+                                       f"捕获间隔 {interval * 1000:.0f} 毫秒 | "
+                                       f"界面线程 {self.update_coalescer.busy_per_second * 1000:.1f} 毫秒/秒 | "
+                                       f"翻译缓存 {cache_stats['entries']} 条, 命中 {cache_stats['hits']}, "
+                                       f"未命中 {cache_stats['misses']}, 淘汰 {cache_stats['evictions']}")
         else:
             self.statusBar.showMessage("就绪")
 
@@ -0,0 +1,206 @@
+import ctypes
+import ctypes.util
+import glob
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import pytesseract
+
+from preprocessing import binarize, split_text_lines
+
+# Tesseract 页面分割模式
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+
+# 界面语言/翻译语言代码到 Tesseract 语言包的映射，其余值按原样传给 Tesseract
+TESSERACT_LANGS = {
+    '日语': 'jpn',
+    '中文': 'chi_sim',
+    '英语': 'eng',
+    'ja': 'jpn',
+    'zh-cn': 'chi_sim',
+    'en': 'eng',
+}
+
+
+def tesseract_lang(lang):
+    return TESSERACT_LANGS.get(lang, lang)
+
+
+class OCREngine:
+    # OCR 引擎接口：recognize() 接收灰度或 BGR 的 np.ndarray，返回识别出的文本
+    def recognize(self, image, psm=PSM_SINGLE_BLOCK):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    # 兼容路径：每次调用都会启动 tesseract 子进程
+    def __init__(self, lang):
+        self.lang = tesseract_lang(lang)
+
+    def recognize(self, image, psm=PSM_SINGLE_BLOCK):
+        return pytesseract.image_to_string(image, config=f'--oem 3 --psm {psm}', lang=self.lang)
+
+
+def _find_tesseract_library():
+    name = ctypes.util.find_library('tesseract')
+    if name:
+        return name
+    # Windows 安装包把 DLL 放在 tesseract.exe 同一目录下
+    candidates = [os.path.dirname(pytesseract.pytesseract.tesseract_cmd),
+                  r'C:\Program Files\Tesseract-OCR']
+    for directory in candidates:
+        if directory:
+            matches = sorted(glob.glob(os.path.join(directory, 'libtesseract*.dll')))
+            if matches:
+                return matches[-1]
+    for name in ('libtesseract.so.5', 'libtesseract.so.4', 'libtesseract.dylib'):
+        try:
+            ctypes.CDLL(name)
+            return name
+        except OSError:
+            continue
+    return None
+
+
+class TesseractAPIEngine(OCREngine):
+    # 通过 Tesseract C API 在进程内识别：语言包只在创建时加载一次，
+    # 图像直接从 NumPy 缓冲区传入，不写临时文件也不启动子进程
+    def __init__(self, lang, datapath=None):
+        self.lang = tesseract_lang(lang)
+        path = _find_tesseract_library()
+        if path is None:
+            raise OSError("未找到 Tesseract 动态库")
+        if os.name == 'nt':
+            # 依赖的 leptonica 等 DLL 与 libtesseract 在同一目录
+            os.add_dll_directory(os.path.dirname(os.path.abspath(path)))
+        self._lib = ctypes.CDLL(path)
+        self._declare(self._lib)
+        self._lock = threading.Lock()
+        self._handle = self._lib.TessBaseAPICreate()
+        datapath = datapath or os.environ.get('TESSDATA_PREFIX')
+        if self._lib.TessBaseAPIInit3(self._handle, datapath.encode() if datapath else None,
+                                      self.lang.encode()) != 0:
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+            raise RuntimeError(f"Tesseract 初始化失败，请确认已安装语言包: {self.lang}")
+        self._psm = None
+
+    @staticmethod
+    def _declare(lib):
+        handle = ctypes.c_void_p
+        lib.TessBaseAPICreate.restype = handle
+        lib.TessBaseAPIInit3.argtypes = [handle, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPIInit3.restype = ctypes.c_int
+        lib.TessBaseAPISetPageSegMode.argtypes = [handle, ctypes.c_int]
+        lib.TessBaseAPISetImage.argtypes = [handle, ctypes.c_void_p, ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPISetSourceResolution.argtypes = [handle, ctypes.c_int]
+        lib.TessBaseAPIGetUTF8Text.argtypes = [handle]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.POINTER(ctypes.c_char)
+        lib.TessDeleteText.argtypes = [ctypes.POINTER(ctypes.c_char)]
+        lib.TessBaseAPIClear.argtypes = [handle]
+        lib.TessBaseAPIEnd.argtypes = [handle]
+        lib.TessBaseAPIDelete.argtypes = [handle]
+
+    def recognize(self, image, psm=PSM_SINGLE_BLOCK):
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape
+        with self._lock:
+            if self._handle is None:
+                raise RuntimeError("OCR 引擎已关闭")
+            if psm != self._psm:
+                self._lib.TessBaseAPISetPageSegMode(self._handle, psm)
+                self._psm = psm
+            self._lib.TessBaseAPISetImage(self._handle, image.ctypes.data, width, height, 1, image.strides[0])
+            # 屏幕截图没有 DPI 信息，固定一个值以免 Tesseract 每帧自行估计并输出警告
+            self._lib.TessBaseAPISetSourceResolution(self._handle, 70)
+            text_ptr = self._lib.TessBaseAPIGetUTF8Text(self._handle)
+            try:
+                return ctypes.string_at(text_ptr).decode('utf-8', errors='replace') if text_ptr else ""
+            finally:
+                if text_ptr:
+                    self._lib.TessDeleteText(text_ptr)
+                self._lib.TessBaseAPIClear(self._handle)
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self._lib.TessBaseAPIEnd(self._handle)
+                self._lib.TessBaseAPIDelete(self._handle)
+                self._handle = None
+
+
+class LineCachingEngine(OCREngine):
+    # 按行识别并缓存：每行以单行模式识别，结果按二值化像素的哈希存入有界 LRU，
+    # 字幕中未变化的行直接命中缓存，只有新出现的行才需要真正识别
+    def __init__(self, engine, max_entries=256):
+        self.engine = engine
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, line):
+        digest = hashlib.blake2b(line.tobytes(), digest_size=16)
+        digest.update(str(line.shape).encode())
+        return digest.digest()
+
+    def recognize(self, image, psm=PSM_SINGLE_BLOCK):
+        binary = binarize(image)
+        lines = split_text_lines(binary)
+        # 分不出行（例如背景杂乱连成一片）时按整块识别
+        block_mode = len(lines) == 1 and lines[0][1] - lines[0][0] > binary.shape[0] * 0.8
+        texts = []
+        for top, bottom in lines:
+            key = self._key(binary[top:bottom])
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                line_psm = psm if block_mode else PSM_SINGLE_LINE
+                text = self.engine.recognize(image[top:bottom], psm=line_psm).strip()
+                self._cache[key] = text
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            if text:
+                texts.append(text)
+        return '\n'.join(texts)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        self._cache.clear()
+        self.engine.close()
+
+
+def create_ocr_engine(lang, prefer_api=True, line_cache_size=256):
+    # 优先使用进程内的 C API 引擎，不可用时退回 pytesseract；
+    # line_cache_size 大于 0 时再套一层按行识别和缓存
+    engine = None
+    if prefer_api:
+        try:
+            engine = TesseractAPIEngine(lang)
+            logging.info(f"使用 Tesseract C API 引擎，语言: {engine.lang}")
+        except (OSError, RuntimeError, AttributeError) as e:
+            logging.warning(f"Tesseract C API 不可用，退回 pytesseract: {e}")
+    if engine is None:
+        engine = PytesseractEngine(lang)
+    if line_cache_size:
+        engine = LineCachingEngine(engine, max_entries=line_cache_size)
+    return engine
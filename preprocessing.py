@@ -0,0 +1,560 @@
+import math
+import time
+
+import cv2
+import numpy as np
+
+# 可选的去噪方式：键为保存在设置中的值，值为界面上显示的名称
+DENOISE_MODES = {
+    'median': '中值滤波',
+    'bilateral': '双边滤波',
+    'open': '形态学开运算',
+    'temporal': '多帧时间平均',
+    'nlmeans': '非局部均值（很慢）',
+}
+
+_OPEN_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+# 文字区域检测：梯度核，以及把同一行的字符连成一块的横向膨胀核
+_EDGE_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+_JOIN_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3))
+
+
+def binarize(image):
+    # 转成"文字为白、背景为黑"的二值图；前景按少数像素一侧判断
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size // 2:
+        cv2.bitwise_not(binary, dst=binary)
+    return binary
+
+
+def split_text_lines(binary, min_height=4, max_gap=2, margin=2, min_pixels=2):
+    # 水平投影分行：返回每一行文字的 (top, bottom) 行范围
+    profile = cv2.reduce(binary, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel() // 255
+    rows = np.flatnonzero(profile >= min_pixels)
+    if rows.size == 0:
+        return []
+    # 间隔超过 max_gap 的行之间断开
+    breaks = np.flatnonzero(np.diff(rows) > max_gap + 1)
+    starts = np.concatenate(([rows[0]], rows[breaks + 1]))
+    ends = np.concatenate((rows[breaks], [rows[-1]])) + 1
+    height = binary.shape[0]
+    return [(max(0, int(top) - margin), min(height, int(bottom) + margin))
+            for top, bottom in zip(starts, ends) if bottom - top >= min_height]
+
+
+def estimate_skew_angle(image, max_angle=30.0):
+    # 用二阶中心矩估计前景（文字）主方向，一次遍历即可得到，不需要收集前景坐标。
+    # 返回 getRotationMatrix2D 使用的角度（度），无法可靠估计时返回 0。
+    moments = cv2.moments(image, binaryImage=True)
+    if moments['m00'] > image.size / 2:
+        # 前景占多数说明是白底黑字，改用反相后的图像计算
+        moments = cv2.moments(cv2.bitwise_not(image), binaryImage=True)
+    if moments['m00'] == 0:
+        return 0.0
+    mu20, mu02, mu11 = moments['mu20'], moments['mu02'], moments['mu11']
+    # 前景不够"扁长"时方向没有意义
+    if mu20 <= mu02 * 1.5:
+        return 0.0
+    angle = math.degrees(0.5 * math.atan2(2 * mu11, mu20 - mu02))
+    return angle if abs(angle) <= max_angle else 0.0
+
+
+class Deskewer:
+    # 倾斜校正：字幕倾斜角度不会逐帧变化，角度按捕获区域缓存，每 refresh_every 帧重新估计一次；
+    # 角度小于 tolerance 时直接跳过旋转
+    def __init__(self, tolerance=0.3, refresh_every=50):
+        self.tolerance = tolerance
+        self.refresh_every = refresh_every
+        self.angle = None
+        self._shape = None
+        self._matrix = None
+        self._frames = 0
+
+    def apply(self, image, dst=None):
+        if self.angle is None or image.shape != self._shape or self._frames >= self.refresh_every:
+            self.angle = estimate_skew_angle(image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+            self._shape = image.shape
+            self._matrix = None
+            self._frames = 0
+        self._frames += 1
+        if abs(self.angle) < self.tolerance:
+            return image
+        (h, w) = image.shape[:2]
+        if self._matrix is None:
+            self._matrix = cv2.getRotationMatrix2D((w // 2, h // 2), self.angle, 1.0)
+        return cv2.warpAffine(image, self._matrix, (w, h), dst=dst, flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+    def reset(self):
+        self.angle = None
+
+
+def estimate_text_height(binary, min_height=4):
+    # 从水平投影估计文字的 x 高度（像素）：每一行文字中，小写字母主体所在的行像素密度最高，
+    # 升部/降部只有少数笔画，取密度不低于该行峰值一半的行数作为 x 高度，多行取中位数。
+    # binary 为"文字为白、背景为黑"的二值图，没有文字时返回 None。
+    profile = cv2.reduce(binary, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+    heights = []
+    for top, bottom in split_text_lines(binary, min_height=min_height, margin=0):
+        line = profile[top:bottom]
+        heights.append(int(np.count_nonzero(line >= line.max() // 2)))
+    if not heights:
+        return None
+    return float(np.median(heights))
+
+
+class TextScaler:
+    # 文字高度归一化：把文字缩放到 Tesseract 识别效果最好的 x 高度（target_height 像素），
+    # 大字幕缩小以减少像素，小字幕放大以减少误识别。缩放比例按捕获区域缓存，每 refresh_every 帧重新估计；
+    # 比例与 1 相差不到 tolerance 时直接跳过缩放
+    def __init__(self, target_height=20, min_scale=0.5, max_scale=3.0, tolerance=0.15, refresh_every=50):
+        self.target_height = target_height
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.tolerance = tolerance
+        self.refresh_every = refresh_every
+        self.scale = None
+        self.text_height = None
+        self._shape = None
+        self._frames = 0
+
+    def estimate(self, image):
+        binary = image if image.ndim == 2 and _is_binary(image) else binarize(image)
+        height = estimate_text_height(binary)
+        if height is None:
+            # 没有文字时无法估计，保持原比例，下一帧重新估计
+            return None
+        self.text_height = height
+        return min(self.max_scale, max(self.min_scale, self.target_height / height))
+
+    def apply(self, image, dst=None):
+        # dst 为预分配的输出缓冲区，尺寸与当前比例不符时会重新分配
+        if self.scale is None or image.shape != self._shape or self._frames >= self.refresh_every:
+            scale = self.estimate(image)
+            self._shape = image.shape
+            self._frames = 0
+            if scale is None:
+                self.scale = None
+                return image
+            self.scale = scale
+        self._frames += 1
+        if abs(self.scale - 1.0) < self.tolerance:
+            return image
+        h, w = image.shape[:2]
+        size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+        # 缩小用面积插值避免笔画断裂，放大用三次插值保持边缘平滑
+        interpolation = cv2.INTER_AREA if self.scale < 1.0 else cv2.INTER_CUBIC
+        if dst is not None and dst.shape[:2] != size[::-1]:
+            dst = None
+        return cv2.resize(image, size, dst=dst, interpolation=interpolation)
+
+    def reset(self):
+        self.scale = None
+
+
+def _is_binary(image):
+    # 粗略判断：取样像素只有 0 和 255
+    sample = image[::max(1, image.shape[0] // 8), ::max(1, image.shape[1] // 64)]
+    return np.all((sample == 0) | (sample == 255))
+
+
+def find_text_box(image, scale=4, edge_threshold=48, min_area=4, work=None):
+    # 在缩小 scale 倍的灰度图上做形态学梯度，横向膨胀把字符连成文字块，再用连通域去掉孤立噪点，
+    # 返回所有文字块的外接矩形 (x, y, w, h)（原图坐标），没有文字时返回 None。
+    # work 为可复用的中间缓冲区字典
+    work = {} if work is None else work
+    h, w = image.shape[:2]
+    size = (max(1, w // scale), max(1, h // scale))
+    small = work.get('small')
+    if small is None or small.shape[:2] != (size[1], size[0]) or small.ndim != image.ndim:
+        small = work['small'] = np.empty((size[1], size[0]) + image.shape[2:], dtype=np.uint8)
+        work['gray'] = np.empty((size[1], size[0]), dtype=np.uint8)
+        work['edges'] = np.empty((size[1], size[0]), dtype=np.uint8)
+    # 线性插值比面积插值快得多，缩小后的笔画略有丢失，对估计外接框影响不大
+    cv2.resize(image, size, dst=small, interpolation=cv2.INTER_LINEAR)
+    gray = small
+    if small.ndim == 3:
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=work['gray'])
+    edges = work['edges']
+    cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, _EDGE_KERNEL, dst=edges)
+    cv2.threshold(edges, edge_threshold, 255, cv2.THRESH_BINARY, dst=edges)
+    cv2.dilate(edges, _JOIN_KERNEL, dst=edges)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(edges, connectivity=8)
+    boxes = stats[1:][stats[1:, cv2.CC_STAT_AREA] >= min_area]
+    if not len(boxes):
+        return None
+    x0 = int(boxes[:, cv2.CC_STAT_LEFT].min())
+    y0 = int(boxes[:, cv2.CC_STAT_TOP].min())
+    x1 = int((boxes[:, cv2.CC_STAT_LEFT] + boxes[:, cv2.CC_STAT_WIDTH]).max())
+    y1 = int((boxes[:, cv2.CC_STAT_TOP] + boxes[:, cv2.CC_STAT_HEIGHT]).max())
+    return (x0 * scale, y0 * scale, min(w, x1 * scale) - x0 * scale, min(h, y1 * scale) - y0 * scale)
+
+
+class TextCropper:
+    # 文字区域裁剪：只把文字外接框加上 margin 送去后续处理和 OCR。
+    # 裁剪框跨帧复用：新的文字框仍在裁剪框内时不变（输出尺寸稳定，缓冲区和行缓存都能复用），
+    # 文字移出裁剪框时立即扩大，文字明显缩小并持续 shrink_after 帧后才收紧
+    def __init__(self, margin=8, shrink_after=30):
+        self.margin = margin
+        self.shrink_after = shrink_after
+        self.box = None
+        self.empty = False
+        self._shape = None
+        self._small_frames = 0
+        self._work = {}
+
+    def _expand(self, box, shape):
+        x, y, w, h = box
+        height, width = shape[:2]
+        x0, y0 = max(0, x - self.margin), max(0, y - self.margin)
+        return (x0, y0, min(width, x + w + self.margin) - x0, min(height, y + h + self.margin) - y0)
+
+    def update(self, image):
+        # 返回本帧使用的裁剪框，没有文字时返回 None
+        if image.shape != self._shape:
+            self.box = None
+            self._shape = image.shape
+        text_box = find_text_box(image, work=self._work)
+        self.empty = text_box is None
+        if text_box is None:
+            return None
+        x, y, w, h = text_box
+        if self.box is not None:
+            bx, by, bw, bh = self.box
+            inside = bx <= x and by <= y and x + w <= bx + bw and y + h <= by + bh
+            if inside:
+                self._small_frames = self._small_frames + 1 if w * h * 2 < bw * bh else 0
+                if self._small_frames < self.shrink_after:
+                    return self.box
+        self.box = self._expand(text_box, image.shape)
+        self._small_frames = 0
+        return self.box
+
+    def apply(self, image):
+        box = self.update(image)
+        if box is None:
+            return None
+        x, y, w, h = box
+        return image[y:y + h, x:x + w]
+
+    def reset(self):
+        self.box = None
+
+
+class TemporalAverager:
+    # 多帧时间平均：对连续帧做指数滑动平均，抑制逐帧变化的背景噪点，静止的字幕保持清晰。
+    # 必须作用于每一帧原始画面（在变化检测之前，见 create_frame_averager）：
+    # 变化检测之后的帧两两都是不同的字幕，平均只会把上一句叠到新的一句上。
+    def __init__(self, alpha=0.5):
+        self.alpha = alpha
+        self._accumulator = None
+        self._output = None
+
+    def apply(self, image, dst=None):
+        if self._accumulator is None or self._accumulator.shape != image.shape:
+            self._accumulator = image.astype(np.float32)
+            self._output = np.empty(image.shape, dtype=np.uint8)
+        else:
+            cv2.accumulateWeighted(image, self._accumulator, self.alpha)
+        return cv2.convertScaleAbs(self._accumulator, dst=self._output if dst is None else dst)
+
+    def reset(self):
+        self._accumulator = None
+
+
+def create_frame_averager(options):
+    # 去噪方式为多帧时间平均时返回在抓取之后、变化检测之前使用的 TemporalAverager，否则返回 None
+    if options.get('denoise') and options.get('denoise_mode') == 'temporal':
+        return TemporalAverager()
+    return None
+
+
+def denoise(image, mode, temporal=None, dst=None):
+    # dst 为预分配的输出缓冲区（与 image 形状相同，不能是 image 本身）
+    if mode == 'median':
+        return cv2.medianBlur(image, 3, dst=dst)
+    if mode == 'bilateral':
+        return cv2.bilateralFilter(image, 5, 50, 50, dst=dst)
+    if mode == 'open':
+        return cv2.morphologyEx(image, cv2.MORPH_OPEN, _OPEN_KERNEL, dst=dst)
+    if mode == 'temporal':
+        return (temporal or TemporalAverager()).apply(image, dst=dst)
+    if mode == 'nlmeans':
+        return cv2.fastNlMeansDenoising(image, dst=dst)
+    raise ValueError(f"未知的去噪方式: {mode}")
+
+
+def measure_denoise_cost(mode, image, repeats=5):
+    # 返回指定去噪方式处理一帧的耗时（毫秒，取中位数）
+    temporal = TemporalAverager()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        denoise(image, mode, temporal)
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+class PreprocessStage:
+    # 预处理阶段接口：
+    #   configure(input_shape) 在该阶段的输入尺寸确定（或改变）时调用一次，分配输出缓冲区；
+    #   process(image) 每帧调用，结果写入自己的缓冲区，不做逐帧内存分配；返回 None 表示这一帧不需要识别；
+    #   reset() 清除跨帧状态。
+    # 返回的数组会在下一帧被覆盖，需要保留时请 copy()。
+    name = 'stage'
+
+    def configure(self, input_shape):
+        pass
+
+    def process(self, image):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+
+class GrayscaleStage(PreprocessStage):
+    name = 'grayscale'
+
+    def configure(self, input_shape):
+        self._buffer = np.empty(input_shape[:2], dtype=np.uint8) if len(input_shape) == 3 else None
+
+    def process(self, image):
+        if self._buffer is None:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._buffer)
+
+
+class DenoiseStage(PreprocessStage):
+    name = 'denoise'
+
+    def __init__(self, mode):
+        if mode not in DENOISE_MODES:
+            raise ValueError(f"未知的去噪方式: {mode}")
+        self.mode = mode
+        self.temporal = TemporalAverager()
+
+    def configure(self, input_shape):
+        self._buffer = np.empty(input_shape, dtype=np.uint8)
+        self.temporal.reset()
+
+    def process(self, image):
+        # 多帧时间平均已在抓取时对原始帧完成（create_frame_averager），这里原样传递
+        if self.mode == 'temporal':
+            return image
+        return denoise(image, self.mode, self.temporal, dst=self._buffer)
+
+    def reset(self):
+        self.temporal.reset()
+
+
+class ThresholdStage(PreprocessStage):
+    name = 'threshold'
+
+    def configure(self, input_shape):
+        self._buffer = np.empty(input_shape, dtype=np.uint8)
+
+    def process(self, image):
+        cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=self._buffer)
+        return self._buffer
+
+
+class DeskewStage(PreprocessStage):
+    name = 'deskew'
+
+    def __init__(self):
+        self.deskewer = Deskewer()
+
+    def configure(self, input_shape):
+        self._buffer = np.empty(input_shape, dtype=np.uint8)
+        self.deskewer.reset()
+
+    def process(self, image):
+        # 角度低于容差时 Deskewer 原样返回输入，不做任何拷贝
+        return self.deskewer.apply(image, dst=self._buffer)
+
+    def reset(self):
+        self.deskewer.reset()
+
+
+class TextCropStage(PreprocessStage):
+    # 输出为输入的视图（不拷贝）；画面中没有文字时返回 None，流水线随即结束，这一帧不做 OCR
+    name = 'crop_text'
+
+    def __init__(self, margin=8):
+        self.cropper = TextCropper(margin=margin)
+
+    def configure(self, input_shape):
+        self.cropper.reset()
+
+    def process(self, image):
+        return self.cropper.apply(image)
+
+    def reset(self):
+        self.cropper.reset()
+
+
+class TextScaleStage(PreprocessStage):
+    # 输出尺寸随缩放比例变化，缓冲区在比例改变时才重新分配，下游阶段由流水线按新尺寸重新配置
+    name = 'text_scale'
+
+    def __init__(self, target_height=20):
+        self.scaler = TextScaler(target_height=target_height)
+        self._buffer = None
+
+    def configure(self, input_shape):
+        self.scaler.reset()
+
+    def process(self, image):
+        result = self.scaler.apply(image, dst=self._buffer)
+        if result is not image:
+            self._buffer = result
+        return result
+
+    def reset(self):
+        self.scaler.reset()
+
+
+class ColorKeyStage(PreprocessStage):
+    # 按字幕颜色和描边对比度提取文字，输出"文字为白、背景为黑"的二值图：
+    # 像素颜色接近某个字幕主色，邻域内存在深色描边，且比邻域最暗处亮出 contrast 以上，才视为文字；
+    # 有纹理或噪点的背景上零星的暗点不足以让周围的背景像素通过。
+    # 主色在会话开始的若干帧中自动学习，学到之前使用白色和黄色。参与学习的候选像素还须符合字幕配色：
+    # 低饱和度（白、浅灰）或黄色，避免把亮的背景色学成主色。
+    name = 'color_key'
+    DEFAULT_KEYS = [(255, 255, 255), (0, 255, 255)]
+
+    def __init__(self, tolerance=60, outline_threshold=80, contrast=120, outline_radius=3, learn_frames=5,
+                 max_keys=2):
+        self.tolerance = tolerance
+        self.outline_threshold = outline_threshold
+        self.contrast = contrast
+        self.learn_frames = learn_frames
+        self.max_keys = max_keys
+        self.keys = list(self.DEFAULT_KEYS)
+        self.learned = False
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * outline_radius + 1,) * 2)
+        self._samples = []
+        self._learned_frames = 0
+
+    def configure(self, input_shape):
+        if len(input_shape) != 3:
+            raise ValueError("字幕颜色提取需要彩色输入，请将其放在灰度化之前")
+        h, w = input_shape[:2]
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._outline = np.empty((h, w), dtype=np.uint8)
+        self._eroded = np.empty((h, w), dtype=np.uint8)
+        self._contrast = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.empty(input_shape, dtype=np.uint8)
+        self._key_mask = np.empty((h, w), dtype=np.uint8)
+        self._buffer = np.empty((h, w), dtype=np.uint8)
+
+    def _learn(self, image):
+        # 候选文字像素：本身很亮，邻域内有深色描边且对比度足够，颜色为白色系或黄色
+        candidates = (self._gray > 160) & (self._outline > 0)
+        if not candidates.any():
+            return
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hue, saturation = hsv[..., 0], hsv[..., 1]
+        candidates &= (saturation < 60) | ((hue >= 20) & (hue <= 40))
+        pixels = image[candidates]
+        if len(pixels) < 50:
+            return
+        if len(pixels) > 2000:
+            pixels = pixels[np.linspace(0, len(pixels) - 1, 2000).astype(int)]
+        self._samples.append(pixels)
+        self._learned_frames += 1
+        if self._learned_frames < self.learn_frames:
+            return
+        samples = np.concatenate(self._samples).astype(np.float32)
+        k = min(self.max_keys, len(samples))
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+        _, labels, centers = cv2.kmeans(samples, k, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+        counts = np.bincount(labels.ravel(), minlength=k)
+        # 只保留占比足够的主色，去掉偶然的高亮背景
+        self.keys = [tuple(int(c) for c in center) for center, count in zip(centers, counts)
+                     if count >= len(samples) * 0.1]
+        self.learned = True
+        self._samples = []
+
+    def process(self, image):
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        # 邻域最小值低于阈值说明附近有深色描边
+        cv2.erode(self._gray, self._kernel, dst=self._eroded)
+        cv2.threshold(self._eroded, self.outline_threshold, 255, cv2.THRESH_BINARY_INV, dst=self._outline)
+        # 本身比邻域最暗处亮出 contrast 以上
+        cv2.subtract(self._gray, self._eroded, dst=self._contrast)
+        cv2.threshold(self._contrast, self.contrast, 255, cv2.THRESH_BINARY, dst=self._contrast)
+        cv2.bitwise_and(self._outline, self._contrast, dst=self._outline)
+        if not self.learned:
+            self._learn(image)
+        self._buffer.fill(0)
+        for key in self.keys:
+            cv2.absdiff(image, key + (0,), dst=self._diff)
+            cv2.inRange(self._diff, (0, 0, 0), (self.tolerance,) * 3, dst=self._key_mask)
+            cv2.bitwise_or(self._buffer, self._key_mask, dst=self._buffer)
+        return cv2.bitwise_and(self._buffer, self._outline, dst=self._buffer)
+
+    def reset(self):
+        self.keys = list(self.DEFAULT_KEYS)
+        self.learned = False
+        self._samples = []
+        self._learned_frames = 0
+
+
+class PreprocessPipeline:
+    # 编译后的预处理流水线：按顺序执行各阶段，各阶段的输入尺寸不变时复用所有缓冲区；
+    # 某个阶段的输入尺寸改变（例如前面的缩放比例变化）时只重新配置该阶段
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self._shapes = [None] * len(self.stages)
+
+    def process(self, image):
+        for i, stage in enumerate(self.stages):
+            if image.shape != self._shapes[i]:
+                stage.configure(image.shape)
+                self._shapes[i] = image.shape
+            image = stage.process(image)
+            if image is None:
+                # 前面的阶段判定没有文字，跳过后续阶段和 OCR
+                return None
+        return image
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+
+# 已注册的阶段：(顺序, 名称, 工厂函数)。工厂函数接收预处理选项，未启用时返回 None
+_STAGE_REGISTRY = []
+
+
+def register_stage(name, factory, order):
+    # 扩展点：注册自定义阶段（例如缩放、按颜色提取字幕），order 决定在流水线中的位置
+    _STAGE_REGISTRY[:] = [entry for entry in _STAGE_REGISTRY if entry[1] != name]
+    _STAGE_REGISTRY.append((order, name, factory))
+    _STAGE_REGISTRY.sort(key=lambda entry: entry[0])
+
+
+register_stage('crop_text', lambda options: TextCropStage() if options.get('crop_text') else None, 0)
+register_stage('color_key', lambda options: ColorKeyStage() if options.get('color_key') else None, 5)
+register_stage('grayscale', lambda options: GrayscaleStage() if options.get('grayscale') else None, 10)
+register_stage('denoise', lambda options: DenoiseStage(options.get('denoise_mode', 'median'))
+               if options.get('denoise') else None, 20)
+register_stage('normalize_height', lambda options: TextScaleStage(options.get('target_text_height', 20))
+               if options.get('normalize_height') else None, 25)
+register_stage('threshold', lambda options: ThresholdStage() if options.get('threshold') else None, 30)
+register_stage('deskew', lambda options: DeskewStage() if options.get('deskew') else None, 40)
+
+
+def compile_preprocess(options, extra_stages=()):
+    # 把预处理选项编译成有序的阶段流水线；extra_stages 中的阶段追加在最后
+    stages = []
+    for _, _, factory in _STAGE_REGISTRY:
+        stage = factory(options)
+        if stage is not None:
+            stages.append(stage)
+    stages.extend(extra_stages)
+    return PreprocessPipeline(stages)
@@ -0,0 +1,113 @@
+from PyQt5.QtCore import QPointF, QRectF, QSize, Qt, QTimer
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QStaticText, QTextOption
+from PyQt5.QtWidgets import QApplication, QWidget
+
+
+class SubtitleOverlay(QWidget):
+    # 叠加在视频上方的字幕浮层：无边框、始终置顶、鼠标点击穿透，只绘制最近 max_lines 条译文。
+    # 文字排版缓存在 QStaticText 中，只有内容、字号或宽度改变时才重新排版和重绘；
+    # 没有新字幕时不做任何工作，hide_after 秒后清空一次。
+    def __init__(self, font_size=28, max_lines=2, hide_after=6.0, parent=None):
+        super().__init__(parent, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool
+                         | Qt.WindowTransparentForInput)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.max_lines = max_lines
+        self.margin = 12
+        self._font = QFont()
+        self._font.setPixelSize(font_size)
+        self._lines = []
+        self._static_texts = []
+        self._layout_width = None
+        self._placement = None
+        self._hide_timer = QTimer(self)
+        self._hide_timer.setSingleShot(True)
+        self._hide_timer.setInterval(int(hide_after * 1000))
+        self._hide_timer.timeout.connect(self.clear)
+        self.paint_count = 0
+
+    def place_on_screen(self, screen=None, width_ratio=0.8, bottom_margin=80):
+        # 默认放在主屏幕底部居中；高度按当前字号容纳 max_lines 条各折成两行的译文
+        self._placement = (screen, width_ratio, bottom_margin)
+        screen = screen or QApplication.primaryScreen()
+        area = screen.availableGeometry()
+        width = int(area.width() * width_ratio)
+        height = self.max_lines * QFontMetrics(self._font).height() * 2 + 2 * self.margin
+        self.setGeometry(area.x() + (area.width() - width) // 2, area.bottom() - bottom_margin - height,
+                         width, height)
+
+    def set_font_size(self, size):
+        if self._font.pixelSize() != size:
+            self._font.setPixelSize(size)
+            # 字号改变后按新的行高重新计算浮层大小
+            if self._placement is not None:
+                self.place_on_screen(*self._placement)
+            self._relayout()
+
+    def show_text(self, text):
+        # 新的一条译文；与最后一条相同时不重绘
+        text = text.strip()
+        if not text:
+            return
+        self._hide_timer.start()
+        if self._lines and self._lines[-1] == text:
+            return
+        self._lines = (self._lines + [text])[-self.max_lines:]
+        self._relayout()
+
+    def clear(self):
+        if self._lines:
+            self._lines = []
+            self._relayout()
+
+    def _relayout(self):
+        width = max(1, self.width() - 2 * self.margin)
+        self._layout_width = width
+        option = QTextOption(Qt.AlignHCenter)
+        option.setWrapMode(QTextOption.WordWrap)
+        self._static_texts = []
+        for line in self._lines:
+            static_text = QStaticText(line)
+            static_text.setTextFormat(Qt.PlainText)
+            static_text.setTextOption(option)
+            static_text.setTextWidth(width)
+            static_text.prepare(font=self._font)
+            self._static_texts.append(static_text)
+        self.update()
+
+    def resizeEvent(self, event):
+        if self.width() - 2 * self.margin != self._layout_width:
+            self._relayout()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        self.paint_count += 1
+        if not self._static_texts:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        painter.setFont(self._font)
+        static_texts = list(self._static_texts)
+        sizes = [static_text.size() for static_text in static_texts]
+        total = sum(size.height() for size in sizes)
+        # 放不下时丢掉较早的译文，保证最新一条完整显示
+        while len(sizes) > 1 and total > self.height() - 2 * self.margin:
+            total -= sizes.pop(0).height()
+            static_texts.pop(0)
+        # 文字贴着浮层底部，多条时从下往上排列
+        y = self.height() - self.margin - total
+        box = QRectF(0, y - self.margin / 2, self.width(), total + self.margin)
+        painter.fillRect(box, QColor(0, 0, 0, 150))
+        for static_text, size in zip(static_texts, sizes):
+            position = QPointF(self.margin, y)
+            # 描边效果：先用黑色偏移绘制，再绘制白色文字
+            painter.setPen(QColor(0, 0, 0))
+            painter.drawStaticText(position + QPointF(2, 2), static_text)
+            painter.setPen(QColor(255, 255, 255))
+            painter.drawStaticText(position, static_text)
+            y += size.height()
+
+    def sizeHint(self):
+        return QSize(800, 160)
+
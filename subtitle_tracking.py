@@ -0,0 +1,310 @@
+import re
+import time
+from collections import OrderedDict
+
+from translation_cache import normalize_text
+
+# 按句末标点或换行切分，切分点保留在前一段末尾
+SENTENCE_BOUNDARY = re.compile(r'(?<=[。！？!?\n])')
+# 增量字幕的句子边界：在上面的基础上，后面跟空白或位于末尾的英文句点也算句末
+LINE_BOUNDARY = re.compile(r'(?<=[。！？!?\n])|(?<=\.)(?=\s|$)')
+_SENTENCE_END = set('。！？!?.\n')
+# 比较句子时忽略的字符：空白和常见标点（OCR 最容易在这些位置抖动）
+_IGNORED_CHARS = re.compile(r'[\s\.,!?;:\'"`~\-_。、，．！？；：「」『』（）()\[\]…・]+')
+
+
+def dedup_key(sentence):
+    # 去重用的规范化：NFKC、小写、去掉空白和标点
+    return _IGNORED_CHARS.sub('', normalize_text(sentence).lower())
+
+
+def _ngrams(key, n):
+    if len(key) <= n:
+        return {key}
+    return {key[i:i + n] for i in range(len(key) - n + 1)}
+
+
+def bounded_edit_distance(a, b, limit):
+    # 编辑距离，超过 limit 时提前返回 limit + 1；只计算对角线附近宽度为 2*limit+1 的带状区域
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    big = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        current = [big] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return big
+        previous = current
+    return min(previous[len(b)], big)
+
+
+class SentenceDedupIndex:
+    # 最近字幕句子的有界去重索引，容忍 OCR 抖动造成的个别字符差异：
+    #   先按规范化文本精确查找（字典，O(1)）；
+    #   未命中时通过 n-gram 倒排表找出共享片段较多的少数候选句，
+    #   再用带状编辑距离核对，相似度 1 - 距离/较长句长度 不低于 threshold 视为重复。
+    # 最多保存 capacity 句，按最近出现的顺序淘汰，倒排表随之清理，
+    # 每次查找只涉及这个窗口内的少量候选，与历史长度无关。
+    # 规范化后短于 min_fuzzy_length 的句子（如「はい」）只做精确匹配。
+    def __init__(self, capacity=16, threshold=0.85, ngram=2, min_fuzzy_length=4, max_candidates=3):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ngram = ngram
+        self.min_fuzzy_length = min_fuzzy_length
+        self.max_candidates = max_candidates
+        self._entries = OrderedDict()
+        self._postings = {}
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _match(self, key):
+        # 返回与 key 重复的已有条目的键，没有时返回 None
+        if key in self._entries:
+            return key
+        if len(key) < self.min_fuzzy_length:
+            return None
+        shared = {}
+        for gram in _ngrams(key, self.ngram):
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        # 共享 n-gram 最多的候选最可能只差几个字符
+        candidates = sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]
+        for candidate in candidates:
+            longest = max(len(key), len(candidate))
+            limit = int(longest * (1 - self.threshold))
+            if bounded_edit_distance(key, candidate, limit) <= limit:
+                return candidate
+        return None
+
+    def find(self, sentence):
+        # 返回与 sentence 重复的最近句子（原文），没有时返回 None
+        key = dedup_key(sentence)
+        if not key:
+            return None
+        match = self._match(key)
+        if match is None:
+            self.misses += 1
+            return None
+        if match == key:
+            self.exact_hits += 1
+        else:
+            self.fuzzy_hits += 1
+        return self._entries[match][1]
+
+    def __contains__(self, sentence):
+        return self.find(sentence) is not None
+
+    def add(self, sentence):
+        # 记录一句字幕；与已有句子重复时只刷新该条目的位置，不再插入变体
+        key = dedup_key(sentence)
+        if not key:
+            return
+        match = self._match(key)
+        if match is not None:
+            self._entries.move_to_end(match)
+            return
+        grams = _ngrams(key, self.ngram)
+        self._entries[key] = (grams, sentence)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+        while len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+
+    def extend(self, sentences):
+        for sentence in sentences:
+            self.add(sentence)
+
+    def _remove(self, key):
+        grams, _ = self._entries.pop(key)
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+
+    def clear(self):
+        self._entries.clear()
+        self._postings.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sentences(self):
+        return [sentence for _, sentence in self._entries.values()]
+
+
+def _closes_sentence(segment):
+    return segment.rstrip(' \t')[-1:] in _SENTENCE_END
+
+
+class GrowingLineTracker:
+    # 逐词增长的实时字幕（如 Windows 实时字幕）：同一行每帧多出几个词，
+    # 直接按句去重时每个更长的前缀都会被当成新句子翻译一遍。
+    # 跟踪器把没有句末标点/换行的最后一段当作"正在输入"的部分文本暂不翻译，
+    # 在以下情况认为这一句结束并交给翻译：
+    #   出现句末标点或换行；这一行被其他内容替换或消失；超过 timeout 秒没有再增长。
+    # 超时提交后这一行如果继续增长，之后只提交新增的部分。
+    # 已完成的整句记录在 dedup（SentenceDedupIndex）中，画面上仍显示的旧句子不会重复提交。
+    def __init__(self, dedup=None, timeout=1.5, threshold=0.85):
+        self.dedup = dedup if dedup is not None else SentenceDedupIndex(threshold=threshold)
+        self.timeout = timeout
+        self.threshold = threshold
+        self.pending = ""
+        self._pending_since = None
+        self._flushed = ""
+        self.completed = 0
+        self.timeouts = 0
+
+    def _extends(self, previous, current):
+        # current 是否为 previous 继续增长的结果（允许少量 OCR 抖动）
+        previous, current = dedup_key(previous), dedup_key(current)
+        if len(current) < len(previous):
+            return False
+        limit = int(len(previous) * (1 - self.threshold))
+        return bounded_edit_distance(previous, current[:len(previous)], limit) <= limit
+
+    def _delta(self, sentence):
+        # 去掉这一句中已经因超时提交过的开头部分
+        text = normalize_text(sentence)
+        if self._flushed:
+            if self._extends(self._flushed, text):
+                text = text[len(self._flushed):].strip()
+            self._flushed = ""
+        return text
+
+    def _complete(self, sentence, output):
+        if sentence in self.dedup:
+            return
+        self.dedup.add(sentence)
+        delta = self._delta(sentence)
+        if delta:
+            self.completed += 1
+            output.append(delta)
+
+    def feed(self, text, now=None):
+        # 输入一帧的 OCR 文本，返回 (需要翻译的新句子列表, 正在输入的部分文本)
+        now = time.monotonic() if now is None else now
+        segments = [segment for segment in LINE_BOUNDARY.split(text) if segment.strip()]
+        partial = ""
+        if segments and not _closes_sentence(segments[-1]):
+            partial = normalize_text(segments.pop())
+        output = []
+        previous = self.pending
+        if previous and not any(self._extends(previous, segment) for segment in segments):
+            if not partial or not self._extends(previous, partial):
+                # 这一行被替换或消失了：按已结束处理
+                self._complete(previous, output)
+        for segment in segments:
+            self._complete(segment, output)
+        if partial and partial in self.dedup:
+            partial = ""
+        if partial != previous:
+            self._pending_since = now
+        self.pending = partial
+        return output, self.pending
+
+    def flush_expired(self, now=None):
+        # 部分文本超过 timeout 秒没有增长时提交，返回需要翻译的新句子列表
+        now = time.monotonic() if now is None else now
+        if not self.pending or now - self._pending_since < self.timeout:
+            return []
+        output = []
+        delta = self._delta(self.pending)
+        if delta:
+            self.timeouts += 1
+            self.completed += 1
+            output.append(delta)
+        self._flushed = normalize_text(self.pending)
+        # 保留部分文本继续跟踪增长，但不再重复提交
+        self._pending_since = float('inf')
+        return output
+
+    def time_until_expiry(self, now=None):
+        # 距离部分文本超时还有多少秒，没有需要等待的部分文本时返回 None
+        if not self.pending or self._pending_since == float('inf'):
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._pending_since + self.timeout - now)
+
+    def reset(self):
+        self.pending = ""
+        self._pending_since = None
+        self._flushed = ""
+
+
+class TextStabilizer:
+    # 多帧稳定：字幕淡入淡出、转场和渲染到一半的帧会识别出乱码，
+    # 同一规范化文本连续出现 frames 帧，或持续 duration 秒没有变化时才放行，每段文本只放行一次。
+    # 画面不变时变化检测会跳过后续帧，因此调用方需要在 time_until_stable() 秒后调用 check()。
+    # 统计：emitted 放行次数，avoided 未稳定就被替换的非空文本数（省下的翻译），
+    # mean_latency 从第一次识别到放行的平均延迟（秒）。
+    def __init__(self, frames=2, duration=0.25):
+        self.frames = frames
+        self.duration = duration
+        self._key = None
+        self._text = None
+        self._first_seen = None
+        self._count = 0
+        self._emitted = False
+        self.emitted = 0
+        self.avoided = 0
+        self.total_latency = 0.0
+
+    def feed(self, text, now=None):
+        # 输入一帧的 OCR 文本，文本刚稳定时返回它，否则返回 None
+        now = time.monotonic() if now is None else now
+        key = dedup_key(text)
+        if key != self._key:
+            if self._key and not self._emitted:
+                self.avoided += 1
+            self._key = key
+            self._first_seen = now
+            self._count = 0
+            self._emitted = False
+        # 使用最新一帧的原文，抖动的标点和空白以最后一次为准
+        self._text = text
+        self._count += 1
+        return self.check(now)
+
+    def check(self, now=None):
+        # 当前文本已经稳定且尚未放行时返回它，否则返回 None
+        if self._key is None or self._emitted:
+            return None
+        now = time.monotonic() if now is None else now
+        if self._count < self.frames and now - self._first_seen < self.duration:
+            return None
+        self._emitted = True
+        if self._key:
+            self.emitted += 1
+            self.total_latency += now - self._first_seen
+        return self._text
+
+    def time_until_stable(self, now=None):
+        # 当前文本还要多久按持续时间放行，没有等待中的文本时返回 None
+        if self._key is None or self._emitted:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._first_seen + self.duration - now)
+
+    @property
+    def mean_latency(self):
+        return self.total_latency / self.emitted if self.emitted else 0.0
+
+    def reset(self):
+        self._key = None
+        self._text = None
+        self._emitted = False
@@ -0,0 +1,189 @@
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import deque
+
+
+class TranscriptEntry:
+    # 一条字幕记录；id 从 0 开始连续编号，等于它在整个会话中的行号。
+    # translation 为 None 表示译文还没有返回，空字符串表示翻译失败
+    __slots__ = ('id', 'timestamp', 'original', 'translation')
+
+    def __init__(self, entry_id, timestamp, original, translation=None):
+        self.id = entry_id
+        self.timestamp = timestamp
+        self.original = original
+        self.translation = translation
+
+    def to_json(self):
+        return json.dumps({'id': self.id, 't': self.timestamp, 'o': self.original, 'tr': self.translation},
+                          ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data['id'], data['t'], data['o'], data['tr'])
+
+    def __repr__(self):
+        return f"TranscriptEntry({self.id}, {self.timestamp:.3f}, {self.original!r}, {self.translation!r})"
+
+
+class TranscriptStore:
+    # 会话字幕记录：最近 capacity 条保存在内存环形缓冲区中，更早的条目溢出到只追加的 JSON Lines 文件。
+    # 追加为 O(1)；溢出条目在内存中只保留文件偏移和时间戳两个数组，按编号随机读取，按时间二分查找。
+    # path 为 None 时不写文件，超出容量的条目直接丢弃。线程安全：流水线线程追加，界面线程读取。
+    def __init__(self, path=None, capacity=500):
+        self.path = path
+        self.capacity = capacity
+        self._ring = deque()
+        self._lock = threading.Lock()
+        # 已溢出条目（编号 0 .. spilled-1）的文件偏移和时间戳
+        self._offsets = array('q')
+        self._times = array('d')
+        self.spilled = 0
+        self.dropped = 0
+        self._count = 0
+        self._last_time = 0.0
+        self._writer = None
+        self._reader = None
+        self._dirty = False
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._writer = open(path, 'ab')
+            self._reader = open(path, 'rb')
+
+    def __len__(self):
+        return self._count
+
+    def append(self, original, translation=None, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            # 时间戳保持单调，便于按时间二分查找
+            timestamp = max(timestamp, self._last_time)
+            self._last_time = timestamp
+            entry = TranscriptEntry(self._count, timestamp, original, translation)
+            self._count += 1
+            self._ring.append(entry)
+            while len(self._ring) > self.capacity:
+                self._spill(self._ring.popleft())
+            return entry
+
+    def _spill(self, entry):
+        if self._writer is None:
+            self.dropped += 1
+            return
+        try:
+            offset = self._write(entry)
+            self._offsets.append(offset)
+            self._times.append(entry.timestamp)
+            self.spilled += 1
+        except OSError as e:
+            logging.error(f"写入字幕记录失败: {e}")
+
+    def _write(self, entry):
+        offset = self._writer.tell()
+        self._writer.write(entry.to_json().encode('utf-8') + b'\n')
+        self._dirty = True
+        return offset
+
+    def update(self, entry_id, translation):
+        # 补齐或修改一条记录的译文，返回修改后的记录。已溢出的条目在文件末尾追加新版本并更新偏移，文件仍只追加
+        with self._lock:
+            first = self._first_id()
+            if first <= entry_id < self._count:
+                entry = self._ring[entry_id - first]
+                entry.translation = translation
+                return entry
+            if self._writer is not None and 0 <= entry_id < self.spilled:
+                entry = self._read(entry_id)
+                entry.translation = translation
+                try:
+                    self._offsets[entry_id] = self._write(entry)
+                except OSError as e:
+                    logging.error(f"写入字幕记录失败: {e}")
+                return entry
+            return None
+
+    def _first_id(self):
+        return self._ring[0].id if self._ring else self._count
+
+    def _read(self, index):
+        if self._dirty:
+            self._writer.flush()
+            self._dirty = False
+        self._reader.seek(self._offsets[index])
+        return TranscriptEntry.from_json(self._reader.readline().decode('utf-8'))
+
+    def get(self, entry_id):
+        # 按编号取一条记录，已丢弃或不存在时返回 None
+        with self._lock:
+            first = self._first_id()
+            if first <= entry_id < self._count:
+                return self._ring[entry_id - first]
+            if self._writer is not None and 0 <= entry_id < self.spilled:
+                return self._read(entry_id)
+            return None
+
+    def entries(self, start, stop):
+        # 按编号范围 [start, stop) 取记录，跳过已丢弃的部分
+        with self._lock:
+            first = self._first_id()
+            start, stop = max(0, start), min(stop, self._count)
+            result = []
+            if self._writer is not None:
+                result.extend(self._read(i) for i in range(start, min(stop, self.spilled)))
+            ring_start = max(start, first)
+            for i in range(ring_start - first, stop - first):
+                result.append(self._ring[i])
+            return result
+
+    def range(self, start_time, end_time):
+        # 按时间范围 [start_time, end_time) 取记录
+        with self._lock:
+            result = []
+            if self._writer is not None:
+                lo = bisect.bisect_left(self._times, start_time)
+                hi = bisect.bisect_left(self._times, end_time)
+                result.extend(self._read(i) for i in range(lo, hi))
+            result.extend(entry for entry in self._ring if start_time <= entry.timestamp < end_time)
+            return result
+
+    def recent(self, count):
+        with self._lock:
+            return list(self._ring)[-count:] if count > 0 else []
+
+    @property
+    def first_available(self):
+        # 仍能读取的最小编号（没有溢出文件时，更早的条目已被丢弃）
+        with self._lock:
+            return 0 if self._writer is not None else self._first_id()
+
+    def close(self):
+        # 关闭时把内存中剩余的条目也写入文件，文件中保存完整的会话记录
+        with self._lock:
+            if self._writer is None:
+                return
+            while self._ring:
+                self._spill(self._ring.popleft())
+            self._writer.close()
+            self._reader.close()
+            self._writer = None
+            self._reader = None
+
+
+def prune_sessions(directory, keep, pattern='session-*.jsonl'):
+    # 只保留最新的 keep 个会话记录文件（文件名带时间戳，按名称排序即按时间排序），返回删除的文件数
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    removed = 0
+    for path in paths[:max(0, len(paths) - keep)]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            logging.error(f"删除旧字幕记录失败: {e}")
+    return removed
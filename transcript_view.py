@@ -0,0 +1,212 @@
+import time
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, QTimer
+from PyQt5.QtWidgets import QAbstractItemView, QListView
+
+
+class TranscriptModel(QAbstractListModel):
+    # 字幕记录的列表模型：数据来自 TranscriptStore，内存中最多保留 max_rows 行。
+    # 新字幕通过 sync() 追加在末尾并淘汰最旧的行；向上滚动时 fetch_older() 从记录中按批读回更早的行，
+    # 此时淘汰最新的行，再滚动到底部时由 Qt 调用 canFetchMore()/fetchMore() 按批读回。
+    OriginalRole = Qt.UserRole + 1
+    TranslationRole = Qt.UserRole + 2
+    EntryIdRole = Qt.UserRole + 3
+
+    def __init__(self, store=None, max_rows=500, batch=100, parent=None):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self.batch = batch
+        self.store = None
+        self._rows = []
+        # 已加载的最后一行之后的编号
+        self._next_id = 0
+        # 末尾是否跟随实时字幕；翻看旧记录时淘汰了最新的行则为 False
+        self.live = True
+        if store is not None:
+            self.set_store(store)
+
+    def set_store(self, store):
+        self.beginResetModel()
+        self.store = store
+        self._rows = store.recent(min(self.batch, self.max_rows))
+        self._next_id = len(store)
+        self.live = True
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._rows):
+            return None
+        entry = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            # 每行固定两行文字（原文、译文），配合 uniformItemSizes 不需要逐行测量高度
+            return f"{entry.original}\n{self._translation_text(entry)}"
+        if role == Qt.ToolTipRole:
+            return f"{entry.original}\n{self._translation_text(entry)}"
+        if role == self.OriginalRole:
+            return entry.original
+        if role == self.TranslationRole:
+            return entry.translation
+        if role == self.EntryIdRole:
+            return entry.id
+        return None
+
+    @staticmethod
+    def _translation_text(entry):
+        # 原文先显示，译文返回后再补齐
+        if entry.translation is None:
+            return "翻译中…"
+        return entry.translation or "（翻译失败）"
+
+    def sync(self):
+        # 把记录中新增的字幕追加到末尾；用户翻看旧记录、末尾未加载时不追加，等滚动到底部再按批读取
+        if self.store is None or not self.live:
+            return 0
+        return self._append(self.store.entries(self._next_id, len(self.store)))
+
+    def _append(self, entries):
+        if not entries:
+            return 0
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._rows.extend(entries)
+        self._next_id = entries[-1].id + 1
+        self.endInsertRows()
+        overflow = len(self._rows) - self.max_rows
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            del self._rows[:overflow]
+            self.endRemoveRows()
+        return len(entries)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.store is not None and self._next_id < len(self.store)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.store is None:
+            return
+        self._append(self.store.entries(self._next_id, min(len(self.store), self._next_id + self.batch)))
+        self.live = self._next_id >= len(self.store)
+
+    def can_fetch_older(self):
+        return bool(self._rows) and self._rows[0].id > self.store.first_available
+
+    def fetch_older(self):
+        # 读回更早的一批记录插入开头，返回插入的行数
+        if self.store is None or not self.can_fetch_older():
+            return 0
+        first_id = self._rows[0].id
+        entries = self.store.entries(max(self.store.first_available, first_id - self.batch), first_id)
+        if not entries:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(entries) - 1)
+        self._rows[:0] = entries
+        self.endInsertRows()
+        overflow = len(self._rows) - self.max_rows
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), len(self._rows) - overflow, len(self._rows) - 1)
+            del self._rows[-overflow:]
+            self._next_id = self._rows[-1].id + 1
+            self.live = False
+            self.endRemoveRows()
+        return len(entries)
+
+    def update_entry(self, entry_id):
+        # 记录中某条字幕被修改（例如译文补齐）后刷新对应的行
+        if not self._rows:
+            return
+        row = entry_id - self._rows[0].id
+        if 0 <= row < len(self._rows):
+            self._rows[row] = self.store.get(entry_id) or self._rows[row]
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class TranscriptView(QListView):
+    # 字幕记录列表：只绘制可见的行；位于底部时自动跟随新字幕，滚动到顶部时读回更早的记录
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)
+        self.setWordWrap(False)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        bar = self.verticalScrollBar()
+        bar.valueChanged.connect(self._on_scroll)
+        bar.rangeChanged.connect(self._on_range_changed)
+        self._follow = True
+
+    def setModel(self, model):
+        super().setModel(model)
+        self._follow = True
+        self.scrollToBottom()
+
+    def _on_range_changed(self, minimum, maximum):
+        # 跟随状态下内容增减后保持在底部
+        if self._follow:
+            self.verticalScrollBar().setValue(maximum)
+
+    def _on_scroll(self, value):
+        bar = self.verticalScrollBar()
+        self._follow = value >= bar.maximum()
+        model = self.model()
+        if value == bar.minimum() and isinstance(model, TranscriptModel):
+            inserted = model.fetch_older()
+            if inserted:
+                # 立即重新布局，并把视图下移插入的高度，保持当前看到的内容不动
+                self.doItemsLayout()
+                bar.setValue(value + inserted * self.sizeHintForRow(0))
+
+    def wheelEvent(self, event):
+        # 已经在顶部时滚动条数值不再变化，继续向上滚动也要读取更早的记录
+        super().wheelEvent(event)
+        if event.angleDelta().y() > 0 and self.verticalScrollBar().value() == self.verticalScrollBar().minimum():
+            self._on_scroll(self.verticalScrollBar().value())
+
+
+class UpdateCoalescer(QObject):
+    # 合并来自字幕线程的界面更新：事件先放入缓冲区，最多每秒 rate 次在界面线程中一次性交给 flush 处理，
+    # 字幕变化很快时也不会每个事件都触发一次重绘。没有事件时定时器不运行，空闲时不占 CPU。
+    # busy_per_second 为最近一秒内 flush 在界面线程中花费的时间（秒/秒）。
+    def __init__(self, flush, rate=30, parent=None):
+        super().__init__(parent)
+        self.flush = flush
+        self._events = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(1, round(1000 / rate)))
+        self._timer.timeout.connect(self._flush)
+        self.events = 0
+        self.flushes = 0
+        self._busy = 0.0
+        self._window_start = time.perf_counter()
+        self._busy_per_second = 0.0
+
+    def push(self, *event):
+        self._events.append(event)
+        self.events += 1
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        events, self._events = self._events, []
+        if not events:
+            return
+        start = time.perf_counter()
+        try:
+            self.flush(events)
+        finally:
+            self.flushes += 1
+            self._busy += time.perf_counter() - start
+
+    @property
+    def busy_per_second(self):
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self._busy_per_second = self._busy / elapsed
+            self._busy = 0.0
+            self._window_start = now
+        return self._busy_per_second
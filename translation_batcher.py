@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import threading
+
+from googletrans import Translator
+
+# 批量请求中句子之间的分隔符；翻译服务会原样保留换行
+BATCH_DELIMITER = '\n'
+
+
+class TranslationBatcher:
+    # 翻译请求的合并与批量发送，运行在独立的后台事件循环线程上，可被任意线程/事件循环调用：
+    #   在 window 秒内到达的同语言句子合并为一次请求，用换行分隔，返回后按行拆回各句；
+    #   同一句子已有请求在进行中时，后来的调用者直接等待同一个结果（single-flight）。
+    # client 为异步翻译客户端（见 translation_client），为 None 时在线程中调用 googletrans。
+    def __init__(self, window=0.03, max_chars=4000, max_retries=3, client=None):
+        self.window = window
+        self.max_chars = max_chars
+        self.max_retries = max_retries
+        self.client = client
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._inflight = {}
+        self._translator = None
+        self.requests = 0
+        self.sentences = 0
+        self.coalesced = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="TranslationBatcher",
+                                                daemon=True)
+                self._thread.start()
+
+    def close(self):
+        with self._lock:
+            if self._thread is not None:
+                if self.client is not None:
+                    # 连接池属于后台事件循环，需要在该循环中关闭
+                    asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result(timeout=5)
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+    def submit(self, text, src, dest):
+        # 线程安全：返回 concurrent.futures.Future，调用方可用 asyncio.wrap_future 等待
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._translate(text, src, dest), self._loop)
+
+    async def _translate(self, text, src, dest):
+        key = (src, dest, text)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        lang = (src, dest)
+        batch = self._pending.get(lang)
+        if batch is None:
+            batch = self._pending[lang] = []
+            self._loop.call_later(self.window, self._flush, lang, batch)
+        batch.append(text)
+        if sum(len(t) for t in batch) >= self.max_chars:
+            self._flush(lang, batch)
+        return await asyncio.shield(future)
+
+    def _flush(self, lang, batch):
+        # 定时器到期或累计长度超限时发送；定时器对应的批次已被提前发送时不做任何事
+        if self._pending.get(lang) is batch:
+            del self._pending[lang]
+            self._loop.create_task(self._send(lang, batch))
+
+    async def _send(self, lang, batch):
+        src, dest = lang
+        try:
+            results = await self._translate_batch(batch, src, dest)
+            for text, result in zip(batch, results):
+                self._inflight[(src, dest, text)].set_result(result)
+        except Exception as e:
+            for text in batch:
+                future = self._inflight[(src, dest, text)]
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for text in batch:
+                self._inflight.pop((src, dest, text), None)
+
+    async def _translate_batch(self, texts, src, dest):
+        self.sentences += len(texts)
+        if len(texts) == 1:
+            return [await self._request(texts[0], src, dest)]
+        result = await self._request(BATCH_DELIMITER.join(texts), src, dest)
+        parts = result.split(BATCH_DELIMITER)
+        if len(parts) == len(texts):
+            return [part.strip() for part in parts]
+        # 分隔符被翻译服务改动时退回逐句翻译
+        logging.warning(f"批量翻译结果无法按句拆分（{len(parts)}/{len(texts)}），改为逐句翻译")
+        return list(await asyncio.gather(*(self._request(text, src, dest) for text in texts)))
+
+    async def _request(self, text, src, dest):
+        for attempt in range(self.max_retries):
+            try:
+                self.requests += 1
+                if self.client is not None:
+                    return await self.client.translate(text, src, dest)
+                # 整个程序共用一个 Translator，重试时也不再重新创建
+                if self._translator is None:
+                    self._translator = Translator()
+                result = await asyncio.to_thread(self._translator.translate, text, src=src, dest=dest)
+                return result.text
+            except Exception:
+                if attempt < self.max_retries - 1:
+                    logging.warning(f"翻译失败，正在重试... (尝试 {attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(1)
+                else:
+                    raise
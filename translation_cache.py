@@ -0,0 +1,214 @@
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    # 全角/半角统一并合并空白，避免 OCR 的细微差异造成缓存未命中
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+class TranslationCache:
+    # 有界的线程安全翻译缓存：键为 (源语言, 目标语言, 规范化文本)，
+    # 超过条目数或字节数上限时按 LRU 淘汰，ttl（秒）为 None 时不过期
+    def __init__(self, max_entries=2000, max_bytes=4 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text, src, dest):
+        return (src, dest, normalize_text(text))
+
+    def get(self, text, src, dest):
+        key = self.make_key(text, src, dest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, text, src, dest, translation):
+        key = self.make_key(text, src, dest)
+        size = len(key[2].encode('utf-8')) + len(translation.encode('utf-8'))
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (translation, size, expires)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class DiskTranslationCache:
+    # 基于 SQLite（WAL 模式）的持久化翻译缓存，作为内存缓存之后的第二层：
+    # 读取在调用线程直接查询，写入交给后台线程批量提交，捕获循环不会被磁盘 IO 阻塞。
+    # 条目数超过 max_entries 时按最近访问时间淘汰最旧的记录。
+    # 启动时条目数已超过上限，或本次运行淘汰的记录超过上限的十分之一时整理数据库文件（VACUUM）。
+    def __init__(self, path, max_entries=100000, trim_every=500):
+        self.path = path
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self.hits = 0
+        self.misses = 0
+        self._read_lock = threading.Lock()
+        self._read_conn = self._connect()
+        self._read_conn.executescript("""
+            CREATE TABLE IF NOT EXISTS translations (
+                src TEXT NOT NULL,
+                dest TEXT NOT NULL,
+                text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                UNIQUE (src, dest, text)
+            );
+            CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed);
+        """)
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="TranslationCacheWriter", daemon=True)
+        self._writer.start()
+        with self._read_lock:
+            count = self._read_conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        if count > self.max_entries:
+            self.compact()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def get(self, text, src, dest):
+        key = TranslationCache.make_key(text, src, dest)
+        with self._read_lock:
+            row = self._read_conn.execute(
+                'SELECT translation FROM translations WHERE src = ? AND dest = ? AND text = ?', key).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._queue.put(('touch', key, time.time()))
+        return row[0]
+
+    def put(self, text, src, dest, translation):
+        self._queue.put(('put', TranslationCache.make_key(text, src, dest), translation, time.time()))
+
+    def load_hot_set(self, cache, limit=1000):
+        # 启动时把最近使用的条目预热到内存缓存；按从旧到新的顺序放入，保持 LRU 顺序
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                'SELECT src, dest, text, translation FROM translations ORDER BY accessed DESC LIMIT ?',
+                (limit,)).fetchall()
+        for src, dest, text, translation in reversed(rows):
+            cache.put(text, src, dest, translation)
+        return len(rows)
+
+    def compact(self):
+        # 淘汰超出上限的旧记录并整理数据库文件，在后台线程执行
+        self._queue.put(('compact',))
+
+    def _write_loop(self):
+        conn = self._connect()
+        written = 0
+        # 上次整理之后淘汰的记录数
+        deleted = 0
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for item in batch:
+                        if item is None:
+                            running = False
+                        elif item[0] == 'put':
+                            _, (src, dest, text), translation, now = item
+                            conn.execute(
+                                'INSERT INTO translations (src, dest, text, translation, created, accessed) '
+                                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (src, dest, text) DO UPDATE SET '
+                                'translation = excluded.translation, accessed = excluded.accessed',
+                                (src, dest, text, translation, now, now))
+                            written += 1
+                        elif item[0] == 'touch':
+                            _, key, now = item
+                            conn.execute('UPDATE translations SET accessed = ? '
+                                         'WHERE src = ? AND dest = ? AND text = ?', (now,) + key)
+                if written >= self.trim_every:
+                    deleted += self._trim(conn)
+                    written = 0
+                if any(item is not None and item[0] == 'compact' for item in batch):
+                    self._trim(conn)
+                    conn.execute('VACUUM')
+                    deleted = 0
+            except sqlite3.Error as e:
+                logging.error(f"写入翻译缓存失败: {e}")
+        try:
+            deleted += self._trim(conn)
+            if deleted > self.max_entries // 10:
+                conn.execute('VACUUM')
+        except sqlite3.Error as e:
+            logging.error(f"整理翻译缓存失败: {e}")
+        conn.close()
+
+    def _trim(self, conn):
+        with conn:
+            count = conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            conn.execute('DELETE FROM translations WHERE rowid IN '
+                         '(SELECT rowid FROM translations ORDER BY accessed LIMIT ?)',
+                         (count - self.max_entries,))
+            return count - self.max_entries
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        with self._read_lock:
+            self._read_conn.close()
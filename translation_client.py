@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import logging
+
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:  # 没有 aiohttp 时由 TranslationBatcher 退回 googletrans
+    aiohttp = None
+
+DEFAULT_BASE_URL = 'https://translate.googleapis.com'
+# 超过这个长度的文本改用 POST，避免 URL 过长
+MAX_GET_CHARS = 1000
+
+
+def google_lang(code):
+    # googletrans 风格的 zh-cn/zh-tw 转成接口使用的 zh-CN/zh-TW
+    if code.lower() in ('zh-cn', 'zh-tw'):
+        return code[:2].lower() + '-' + code[3:].upper()
+    return code
+
+
+class TranslationError(Exception):
+    pass
+
+
+class GoogleTranslateClient:
+    # 原生异步翻译客户端：整个程序生命周期内复用同一个 aiohttp 会话和连接池（keep-alive），
+    # 必须在同一个事件循环中使用（TranslationBatcher 的后台循环）
+    def __init__(self, base_url=DEFAULT_BASE_URL, max_connections=4, timeout=10.0, connect_timeout=3.0,
+                 keepalive_timeout=60.0):
+        if aiohttp is None:
+            raise ImportError("需要安装 aiohttp")
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections,
+                                             keepalive_timeout=self.keepalive_timeout)
+            timeout = aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def translate(self, text, src, dest):
+        params = {'client': 'gtx', 'sl': google_lang(src), 'tl': google_lang(dest), 'dt': 't'}
+        url = f'{self.base_url}/translate_a/single'
+        session = self._get_session()
+        if len(text) <= MAX_GET_CHARS:
+            request = session.get(url, params=dict(params, q=text))
+        else:
+            request = session.post(url, params=params, data={'q': text})
+        async with request as response:
+            if response.status != 200:
+                raise TranslationError(f"翻译接口返回 HTTP {response.status}")
+            data = await response.json(content_type=None)
+        try:
+            return ''.join(segment[0] for segment in data[0] if segment[0])
+        except (TypeError, IndexError) as e:
+            raise TranslationError(f"无法解析翻译结果: {e}")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def create_translation_client(**kwargs):
+    if aiohttp is None:
+        logging.warning("未安装 aiohttp，使用 googletrans 翻译")
+        return None
+    return GoogleTranslateClient(**kwargs)
+
+
+def create_stub_app(delay=0.0):
+    # 模拟翻译接口的本地服务：返回 "[目标语言]原文"，逐行保留换行，便于离线测试
+    async def handle(request):
+        if delay:
+            await asyncio.sleep(delay)
+        form = await request.post() if request.method == 'POST' else {}
+        text = form.get('q') or request.query.get('q', '')
+        dest = request.query.get('tl', '')
+        lines = text.split('\n')
+        segments = [[f'[{dest}]{line}' + ('\n' if i < len(lines) - 1 else ''), line]
+                    for i, line in enumerate(lines)]
+        request.app['requests'] += 1
+        return web.json_response([segments, None, request.query.get('sl', '')])
+
+    app = web.Application()
+    app['requests'] = 0
+    app.router.add_route('*', '/translate_a/single', handle)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地翻译接口模拟服务")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='每个请求的模拟延迟（秒）')
+    args = parser.parse_args()
+    web.run_app(create_stub_app(args.delay), host='127.0.0.1', port=args.port)
@@ -1,20 +1,44 @@
 import cv2
 import numpy as np
-import pyautogui
 import pytesseract
 import os
 import sys
-from googletrans import Translator
 import time
 import logging
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from translation_cache import TranslationCache, DiskTranslationCache, normalize_text
+from translation_batcher import TranslationBatcher
+from translation_client import create_translation_client, DEFAULT_BASE_URL
+from preprocessing import compile_preprocess
+from subtitle_tracking import SENTENCE_BOUNDARY, SentenceDedupIndex
+from transcript_store import TranscriptStore
 
 # 设置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# 初始化翻译缓存
-translation_cache = {}
+# 初始化翻译缓存（按语言区分，有界且线程安全，CaptionThread 和 TranslateThread 共用）
+translation_cache = TranslationCache()
+# 磁盘缓存（第二层），由 open_disk_cache 在程序启动时打开
+disk_translation_cache = None
+
+def open_disk_cache(path, hot_set=1000, max_entries=100000):
+    global disk_translation_cache
+    disk_translation_cache = DiskTranslationCache(path, max_entries=max_entries)
+    loaded = disk_translation_cache.load_hot_set(translation_cache, limit=hot_set)
+    logging.info(f"已从磁盘缓存预热 {loaded} 条翻译")
+    return disk_translation_cache
+
+# 翻译请求合并器（后台线程），CaptionThread 和 TranslateThread 共用；
+# 翻译接口地址可通过环境变量 TRANSLATE_BASE_URL 指向本地模拟服务
+translation_batcher = TranslationBatcher(
+    client=create_translation_client(base_url=os.environ.get('TRANSLATE_BASE_URL', DEFAULT_BASE_URL)))
+
+def close_disk_cache():
+    global disk_translation_cache
+    if disk_translation_cache is not None:
+        disk_translation_cache.close()
+        disk_translation_cache = None
 
 def check_tesseract():
     try:
@@ -31,6 +55,7 @@ def check_tesseract():
         sys.exit(1)
 
 def get_caption_area():
+    import pyautogui
     print("请按照以下步骤指定字幕区域：")
     print("1. 将鼠标移动到字幕区域的左上角")
     print("2. 按下回车键")
@@ -45,85 +70,139 @@ def get_caption_area():
     
     return x1, y1, x2 - x1, y2 - y1
 
-async def translate_text(text, src='ja', dest='zh-cn', max_retries=3):
-    if text in translation_cache:
-        return translation_cache[text]
-    
-    translator = Translator()
-    for attempt in range(max_retries):
-        try:
-            result = await asyncio.to_thread(translator.translate, text, src=src, dest=dest)
-            translation_cache[text] = result.text
-            return result.text
-        except Exception as e:
-            if attempt < max_retries - 1:
-                logging.warning(f"翻译失败，正在重试... (尝试 {attempt + 1}/{max_retries})")
-                await asyncio.sleep(1)
-            else:
-                logging.error(f"翻译失败: {e}")
+def lookup_cached_translation(text, src, dest):
+    cached = translation_cache.get(text, src, dest)
+    if cached is None and disk_translation_cache is not None:
+        cached = disk_translation_cache.get(text, src, dest)
+        if cached is not None:
+            translation_cache.put(text, src, dest, cached)
+    return cached
+
+async def translate_text(text, src='ja', dest='zh-cn'):
+    # 逐句查缓存，未命中的句子交给 translation_batcher 合并成一次请求，
+    # 句子之间原有的空白和换行保持不变
+    segments = [segment for segment in SENTENCE_BOUNDARY.split(text) if segment]
+    sentences = [normalize_text(segment) for segment in segments]
+    translations = {}
+    missing = []
+    for sentence in sentences:
+        if sentence and sentence not in translations:
+            translations[sentence] = lookup_cached_translation(sentence, src, dest)
+            if translations[sentence] is None:
+                missing.append(sentence)
+
+    if missing:
+        results = await asyncio.gather(
+            *(asyncio.wrap_future(translation_batcher.submit(sentence, src, dest)) for sentence in missing),
+            return_exceptions=True)
+        for sentence, result in zip(missing, results):
+            if isinstance(result, Exception) or not result:
+                logging.error(f"翻译失败: {result}")
                 return None
+            translations[sentence] = result
+            translation_cache.put(sentence, src, dest, result)
+            if disk_translation_cache is not None:
+                # 只是放入后台写入队列，不会阻塞捕获循环
+                disk_translation_cache.put(sentence, src, dest, result)
+
+    output = []
+    for segment, sentence in zip(segments, sentences):
+        if sentence:
+            leading = segment[:len(segment) - len(segment.lstrip())]
+            trailing = segment[len(segment.rstrip()):]
+            output.append(leading + translations[sentence] + trailing)
+        else:
+            output.append(segment)
+    return ''.join(output)
 
 def split_sentences(text):
     # 简单的句子分割，可以根据日语的特点进行优化
     return text.replace('。', '。\n').split('\n')
 
 def preprocess_image(image, options):
-    if options['grayscale']:
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    if options['denoise']:
-        image = cv2.fastNlMeansDenoising(image)
-    if options['threshold']:
-        _, image = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    if options['deskew']:
-        coords = np.column_stack(np.where(image > 0))
-        angle = cv2.minAreaRect(coords)[-1]
-        if angle < -45:
-            angle = -(90 + angle)
-        else:
-            angle = -angle
-        (h, w) = image.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        image = cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-    return image
-
-async def capture_and_process_captions(x, y, width, height, last_sentences, last_translation, preprocess_options, ocr_lang, translate_src, translate_dest):
+    # 单帧预处理；连续处理多帧时应使用 compile_preprocess 编译一次后反复调用 process()
+    return compile_preprocess(options).process(image)
+
+def recognize_frame(frame, preprocess_options, ocr_lang, ocr_engine=None, preprocessor=None):
+    # 图像预处理：优先使用预先编译好的流水线
+    if preprocessor is not None:
+        frame = preprocessor.process(frame)
+    else:
+        frame = preprocess_image(frame, preprocess_options)
+    # 预处理判定画面中没有文字，不调用 OCR
+    if frame is None:
+        return ""
+    
+    # 优先使用常驻的 OCR 引擎，未提供时按原方式调用 pytesseract
+    if ocr_engine is not None:
+        return ocr_engine.recognize(frame)
+    custom_config = r'--oem 3 --psm 6'
+    return pytesseract.image_to_string(frame, config=custom_config, lang=ocr_lang)
+
+def find_new_sentences(text, last_sentences):
+    # 返回 (新增原文, 本帧的全部句子)。last_sentences 为最近句子的 SentenceDedupIndex
+    # （也接受旧式的句子列表），与最近句子近似相同（OCR 抖动）的句子不算新增
+    if not text.strip():
+        return "", []
+    if not isinstance(last_sentences, SentenceDedupIndex):
+        index = SentenceDedupIndex()
+        index.extend(last_sentences)
+        last_sentences = index
+    new_sentences = [sentence for sentence in split_sentences(text) if sentence.strip()]
+    
+    # 找出新的句子
+    new_original = ' '.join(sentence for sentence in new_sentences if sentence not in last_sentences)
+    return new_original, new_sentences
+
+async def capture_and_process_captions(x, y, width, height, last_sentences, last_translation, preprocess_options, ocr_lang, translate_src, translate_dest,
+                                       frame_source=None, change_detector=None, ocr_engine=None, preprocessor=None,
+                                       text_detector=None, frame_averager=None):
+    # last_sentences 可以是 SentenceDedupIndex，也可以是旧式的句子列表；返回值中总是索引
+    if not isinstance(last_sentences, SentenceDedupIndex):
+        index = SentenceDedupIndex()
+        index.extend(last_sentences)
+        last_sentences = index
+    # last_translation 为会话字幕记录 TranscriptStore；传入旧式的字符串时新建一个，不再拼接长字符串
+    if not isinstance(last_translation, TranscriptStore):
+        last_translation = TranscriptStore()
     try:
-        screenshot = pyautogui.screenshot(region=(x, y, width, height))
-        frame = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+        # 优先使用持久化的帧源，避免每帧创建截图对象和多次拷贝
+        if frame_source is not None:
+            frame = frame_source.grab()
+            if frame is None:
+                return last_sentences, last_translation, "", ""
+        else:
+            import pyautogui
+            screenshot = pyautogui.screenshot(region=(x, y, width, height))
+            frame = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
         
-        # 图像预处理
-        frame = preprocess_image(frame, preprocess_options)
+        # 多帧时间平均（preprocessing.create_frame_averager）作用于每一帧原始画面，在变化检测之前
+        if frame_averager is not None:
+            frame = frame_averager.apply(frame)
         
-        # 使用自定义配置
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(frame, config=custom_config, lang=ocr_lang)
+        # 字幕区域与上一次识别时相比没有变化，跳过预处理和 OCR
+        if change_detector is not None and not change_detector.has_changed(frame):
+            return last_sentences, last_translation, "", ""
         
-        new_original = ""
+        # 字幕区域里没有文字（台词之间的空白），不调用 OCR
+        if text_detector is not None and not text_detector.has_text(frame):
+            return last_sentences, last_translation, "", ""
+        
+        text = recognize_frame(frame, preprocess_options, ocr_lang, ocr_engine, preprocessor)
+        new_original, new_sentences = find_new_sentences(text, last_sentences)
         new_translation = ""
         
-        if text.strip():
-            new_sentences = split_sentences(text)
-            
-            # 找出新的句子
-            if last_sentences:
-                for sentence in new_sentences:
-                    if sentence not in last_sentences:
-                        new_original += sentence + " "
-            else:
-                new_original = ' '.join(new_sentences)
+        if new_original.strip():
+            new_translation = await translate_text(new_original, src=translate_src, dest=translate_dest)
             
-            if new_original.strip():
-                new_translation = await translate_text(new_original, src=translate_src, dest=translate_dest)
+            if new_translation:
+                logging.info(f"新增原文: {new_original}")
+                logging.info(f"新增翻译: {new_translation}")
+                logging.info("-" * 50)
                 
-                if new_translation:
-                    logging.info(f"新增原文: {new_original}")
-                    logging.info(f"新增翻译: {new_translation}")
-                    logging.info("-" * 50)
-                    
-                    # 更新last_sentences和last_translation
-                    last_sentences = (last_sentences + new_sentences)[-5:]
-                    last_translation = last_translation + ' ' + new_translation if last_translation else new_translation
+                # 更新last_sentences和last_translation
+                last_sentences.extend(new_sentences)
+                last_translation.append(new_original, new_translation)
         
         return last_sentences, last_translation, new_original, new_translation
         